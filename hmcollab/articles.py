@@ -1,13 +1,239 @@
+import json
+import os
 from abc import ABCMeta, abstractmethod
 
+import numpy as np
 import pandas as pd
+from scipy import sparse
+
+from hmcollab.bitset import pack_rows
+
+
+class SparseDummies:
+    """One-hot article features as a scipy.sparse CSR matrix, with the column names of
+    pd.get_dummies and the article_id of each row. Supports the parts of the
+    DataFrame interface that ArticleKNN, KnnRecommender and kmeans_consumer use, so
+    it can replace the dense dummies without densifying them."""
+
+    def __init__(self, matrix, columns, article_id):
+        self.matrix = sparse.csr_matrix(matrix)
+        self.columns = list(columns)
+        self.article_id = pd.Series(np.asarray(article_id), name="article_id")
+
+    @classmethod
+    def from_frame(cls, df, features):
+        """Same rows and columns as pd.get_dummies(df, columns=features, prefix=features)"""
+        return ArticleFeatureEncoder(features).fit(df).transform(df)
+
+    FILES = ["data", "indices", "indptr", "article_id"]
+
+    def save(self, directory):
+        """Save the CSR arrays and article ids as .npy files, which load can mmap"""
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+        arrays = {
+            "data": self.matrix.data,
+            "indices": self.matrix.indices,
+            "indptr": self.matrix.indptr,
+            "article_id": self.article_id.values.astype(str),
+        }
+        for name in self.FILES:
+            np.save(os.path.join(directory, name + ".npy"), arrays[name])
+        with open(os.path.join(directory, "columns.json"), "w") as f:
+            json.dump({"columns": self.columns, "shape": self.shape}, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        def array(name):
+            return np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode)
+
+        with open(os.path.join(directory, "columns.json")) as f:
+            header = json.load(f)
+        matrix = sparse.csr_matrix(
+            (array("data"), array("indices"), array("indptr")),
+            shape=tuple(header["shape"]),
+            copy=False,
+        )
+        return cls(matrix, header["columns"], array("article_id").astype(object))
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def values(self):
+        return self.matrix
+
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        return SparseDummies(
+            self.matrix[rows], self.columns, self.article_id.values[rows]
+        )
+
+    def __getitem__(self, mask):
+        """Rows selected by a boolean mask, as with df[mask]"""
+        return self.take(np.flatnonzero(np.asarray(mask)))
+
+    def merge(self, basket, on="article_id", how="inner"):
+        """Same rows, in the same order, as an inner merge of the dummies with the
+        article ids of basket (a DataFrame or Series with an article_id column)"""
+        if on != "article_id" or how != "inner":
+            raise ValueError("only an inner merge on article_id is supported")
+        if isinstance(basket, pd.DataFrame):
+            basket = basket[on]
+        counts = pd.Series(np.asarray(basket)).value_counts()
+        repeats = self.article_id.map(counts).fillna(0).astype(np.int64).values
+        return self.take(np.repeat(np.arange(self.shape[0]), repeats))
+
+    def drop_duplicates(self):
+        """Rows with features unlike any earlier row, as DataFrame.drop_duplicates of
+        the dummies without article_id"""
+        _, first = feature_patterns(self.matrix)
+        return self.take(first)
+
+
+def feature_patterns(values):
+    """Distinct rows of a dense or scipy.sparse matrix, numbered by first row. Rows are
+    found by one vectorized np.unique; rows of 0/1 values are first bit-packed (see
+    bitset.pack_rows), so sparse dummies are never densified whole.
+
+    :return: pattern code of each row, first row of each pattern
+    """
+    if sparse.issparse(values):
+        matrix = sparse.csr_matrix(values)
+        if not matrix.has_canonical_format:
+            matrix = matrix.copy()
+            matrix.sum_duplicates()
+        binary = np.isin(matrix.data, (0, 1)).all()
+    else:
+        matrix = np.asarray(values)
+        binary = np.isin(matrix, (0, 1)).all()
+    if binary:
+        rows = pack_rows(matrix)
+    elif sparse.issparse(matrix):
+        rows = matrix.toarray()
+    else:
+        rows = matrix
+    # one opaque value per row, so np.unique compares whole rows byte for byte
+    rows = np.ascontiguousarray(rows)
+    rows = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1])))
+    _, first, codes = np.unique(rows.ravel(), return_index=True, return_inverse=True)
+    # number the patterns by first row
+    order = np.argsort(first)
+    renumber = np.empty_like(order)
+    renumber[order] = np.arange(len(order))
+    return renumber[codes.reshape(-1)], first[order]
+
+
+class ArticleFeatureEncoder:
+    """One-hot encoder of article features with a fixed vocabulary. fit stores the
+    sorted categories of each feature; transform encodes any articles with those
+    columns, so articles added later are encoded without refitting. Values missing
+    from the vocabulary are encoded as all zeros for that feature."""
+
+    def __init__(self, features, categories=None):
+        """
+        :param features: Names of the article columns to encode
+        :param categories: dict of the categories of each feature, if already fitted
+        """
+        self.features = list(features)
+        self.categories = categories
+
+    def fit(self, df):
+        self.categories = {
+            feature: pd.Categorical(df[feature]).categories for feature in self.features
+        }
+        return self
+
+    @property
+    def columns(self):
+        """Column names, as pd.get_dummies(columns=features, prefix=features)"""
+        return [
+            "{}_{}".format(feature, c)
+            for feature in self.features
+            for c in self.categories[feature]
+        ]
+
+    def transform(self, df, sparse_output=True, use_article_id=True):
+        """
+        :return: SparseDummies, or a DataFrame like pd.get_dummies if not sparse_output
+        """
+        blocks = []
+        for feature in self.features:
+            categories = self.categories[feature]
+            codes = categories.get_indexer(df[feature].values)
+            rows = np.flatnonzero(codes >= 0)
+            blocks.append(
+                sparse.csr_matrix(
+                    (np.ones(len(rows)), (rows, codes[rows])),
+                    shape=(df.shape[0], len(categories)),
+                )
+            )
+        dummies = SparseDummies(
+            sparse.hstack(blocks, format="csr"), self.columns, df.article_id.values
+        )
+        if sparse_output:
+            return dummies
+        x = pd.DataFrame(
+            dummies.values.toarray().astype(np.uint8),
+            columns=self.columns,
+            index=df.index,
+        )
+        if use_article_id:
+            x.insert(0, "article_id", df.article_id.values)
+        return x
+
+    def fit_transform(self, df, **kwargs):
+        return self.fit(df).transform(df, **kwargs)
+
+    def save(self, filename):
+        """Save the vocabulary, e.g. to directories.models("article_features.npz")"""
+        categories = {
+            "categories_{}".format(i): np.asarray(self.categories[feature])
+            for i, feature in enumerate(self.features)
+        }
+        categories = {
+            name: c.astype(str) if c.dtype == object else c
+            for name, c in categories.items()
+        }
+        np.savez(filename, features=np.array(self.features), **categories)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as f:
+            features = list(f["features"])
+            categories = {}
+            for i, feature in enumerate(features):
+                c = f["categories_{}".format(i)]
+                if c.dtype.kind == "U":
+                    c = c.astype(object)
+                categories[feature] = pd.Index(c)
+        return cls(features, categories)
 
 
 class ArticleMunger(metaclass=ABCMeta):
-    def __init__(self, df: pd.DataFrame, use_article_id=False):
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        use_article_id=False,
+        sparse=False,
+        encoder=None,
+        cache=None,
+    ):
+        """
+        :param sparse: x is SparseDummies instead of a dense DataFrame
+        :param encoder: Fitted ArticleFeatureEncoder for the columns of x. If None, the
+            columns are the categories found in df.
+        :param cache: FeatureCache to look x up in before computing it
+        """
         self.df = df
         self.use_article_id = use_article_id
-        self.x = self._to_array()
+        self.sparse = sparse
+        self.encoder = encoder
+        if cache is None:
+            self.x = self._to_array()
+        else:
+            self.x = cache.lookup(self)
 
     @abstractmethod
     def _to_array(self):
@@ -24,6 +250,12 @@ class ArticleFeatureMunger(ArticleMunger, metaclass=ABCMeta):
 
     def _to_array(self):
         features = self.features()
+        if self.encoder is not None:
+            return self.encoder.transform(
+                self.df, sparse_output=self.sparse, use_article_id=self.use_article_id
+            )
+        if self.sparse:
+            return SparseDummies.from_frame(self.df, features)
         if self.use_article_id:
             return pd.get_dummies(
                 self.df[["article_id"] + features], columns=features, prefix=features
@@ -32,9 +264,17 @@ class ArticleFeatureMunger(ArticleMunger, metaclass=ABCMeta):
 
 
 class ArticleFeatureMungerSpecificFeatures(ArticleFeatureMunger):
-    def __init__(self, df: pd.DataFrame, features: list, use_article_id=False):
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        features: list,
+        use_article_id=False,
+        sparse=False,
+        encoder=None,
+        cache=None,
+    ):
         self.__features = features
-        super().__init__(df, use_article_id)
+        super().__init__(df, use_article_id, sparse, encoder, cache)
 
     def features(self):
         return self.__features
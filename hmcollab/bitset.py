@@ -0,0 +1,125 @@
+import numpy as np
+from scipy import sparse
+
+M1 = np.uint64(0x5555555555555555)
+M2 = np.uint64(0x3333333333333333)
+M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+H01 = np.uint64(0x0101010101010101)
+
+
+def popcount(words) -> np.array:
+    """Number of set bits of each uint64 word. numpy 1.24 has no bitwise_count, so
+    this counts the bits of all 64 features of a word with shifts and masks."""
+    words = words - ((words >> np.uint64(1)) & M1)
+    words = (words & M2) + ((words >> np.uint64(2)) & M2)
+    words = (words + (words >> np.uint64(4))) & M4
+    return (words * H01) >> np.uint64(56)
+
+
+def pack_rows(x, threshold=0.5, chunksize=8192) -> np.array:
+    """Pack each row of a 0/1 matrix into uint64 words, 64 features per word.
+
+    :param x: ndarray or scipy.sparse matrix. Values above threshold are set bits, so
+        rows that are not binary (e.g. kmeans cluster centers) are binarized.
+    :return: uint64 array (rows x words)
+    """
+    n, d = x.shape
+    n_bytes = 8 * ((d + 63) // 64)
+    packed = np.zeros((n, n_bytes), dtype=np.uint8)
+    for start in range(0, n, chunksize):
+        rows = x[start : start + chunksize]
+        if sparse.issparse(rows):
+            rows = rows.toarray()
+        bits = np.packbits(np.asarray(rows) > threshold, axis=1, bitorder="little")
+        packed[start : start + chunksize, : bits.shape[1]] = bits
+    return packed.view(np.uint64)
+
+
+def hamming(queries, index, block_size=1024) -> np.array:
+    """Number of differing features of each packed query (rows) and index row
+    (columns). For 0/1 rows this is the squared Euclidean distance.
+
+    :param block_size: Index rows compared at once, so temporaries hold at most
+        queries x block_size x words words
+    """
+    distances = np.empty((len(queries), len(index)), dtype=np.int64)
+    for start in range(0, len(index), block_size):
+        block = index[start : start + block_size]
+        differences = popcount(queries[:, None, :] ^ block[None, :, :])
+        distances[:, start : start + block_size] = differences.sum(axis=2)
+    return distances
+
+
+def jaccard(queries, index, block_size=1024) -> np.array:
+    """1 - |a & b| / |a | b| of each packed query and index row. Two empty rows are
+    at distance 0.
+
+    :param block_size: Index rows compared at once (see hamming)
+    """
+    distances = np.empty((len(queries), len(index)))
+    for start in range(0, len(index), block_size):
+        block = index[start : start + block_size]
+        intersection = popcount(queries[:, None, :] & block[None, :, :]).sum(axis=2)
+        union = popcount(queries[:, None, :] | block[None, :, :]).sum(axis=2)
+        similarity = np.divide(
+            intersection, union, out=np.ones(union.shape), where=union > 0
+        )
+        distances[:, start : start + block_size] = 1 - similarity
+    return distances
+
+
+def smallest(distances, k) -> np.array:
+    """Columns of the k smallest distances of each row, ascending, ties broken by
+    column order as by a stable argsort. Only the k selected columns are sorted."""
+    n = distances.shape[1]
+    if k == 0 or k == n:
+        return np.argsort(distances, axis=1, kind="stable")[:, :k]
+    kth = np.partition(distances, k - 1, axis=1)[:, k - 1 : k]
+    below = distances < kth
+    # fill the remaining places with the first columns at the kth distance
+    ties = distances == kth
+    room = k - below.sum(axis=1, keepdims=True)
+    selected = below | (ties & (np.cumsum(ties, axis=1) <= room))
+    columns = np.nonzero(selected)[1].reshape(-1, k)
+    order = np.argsort(
+        np.take_along_axis(distances, columns, axis=1), axis=1, kind="stable"
+    )
+    return np.take_along_axis(columns, order, axis=1)
+
+
+KERNELS = {"hamming": hamming, "jaccard": jaccard}
+
+
+class BitsetKNN:
+    """Brute-force nearest neighbours of packed binary rows, with the kneighbors
+    interface of sklearn NearestNeighbors. Ties are broken by row order."""
+
+    def __init__(self, n_neighbors=5, metric="hamming", batch_size=64):
+        """
+        :param batch_size: Queries compared with the whole index at once
+        """
+        self.n_neighbors = n_neighbors
+        self.metric = metric
+        self.kernel = KERNELS[metric]
+        self.batch_size = batch_size
+
+    def fit(self, x):
+        self.words = pack_rows(x)
+        self.n_features_in_ = x.shape[1]
+        return self
+
+    def kneighbors(self, x, n_neighbors=None):
+        if n_neighbors is None:
+            n_neighbors = self.n_neighbors
+        queries = pack_rows(x)
+        n_neighbors = min(n_neighbors, len(self.words))
+        distances = []
+        indices = []
+        for start in range(0, len(queries), self.batch_size):
+            d = self.kernel(queries[start : start + self.batch_size], self.words)
+            nearest = smallest(d, n_neighbors)
+            distances.append(np.take_along_axis(d, nearest, axis=1))
+            indices.append(nearest)
+        if not distances:
+            return np.zeros((0, n_neighbors)), np.zeros((0, n_neighbors), dtype=int)
+        return np.concatenate(distances), np.concatenate(indices)
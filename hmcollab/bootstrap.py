@@ -0,0 +1,76 @@
+import statistics
+
+import numpy as np
+
+
+def resample_means(values, n_resamples=1000, seed=42, batch_size=None) -> np.array:
+    """Means of bootstrap resamples of values (e.g. the AP@k of each customer from
+    scoring.ap_at_k_batch). Each batch of resamples is drawn as one index matrix
+    (resamples x customers) and reduced with a single mean.
+
+    AP@k takes few distinct values, so when there are many customers per distinct
+    value, a resample is drawn instead as multinomial counts of the distinct values.
+    Both give resamples of the same distribution.
+
+    :param batch_size: Resamples per index matrix. By default a matrix holds about
+        2**24 indices, so memory stays bounded for any number of customers.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    r = np.random.default_rng(seed)
+    distinct, counts = np.unique(values, return_counts=True)
+    if len(distinct) * 32 <= n:
+        return r.multinomial(n, counts / n, size=n_resamples) @ distinct / n
+    if batch_size is None:
+        batch_size = max(1, 2**24 // max(n, 1))
+    means = np.empty(n_resamples)
+    for start in range(0, n_resamples, batch_size):
+        rows = min(batch_size, n_resamples - start)
+        indices = r.integers(0, n, size=(rows, n), dtype=np.int32)
+        means[start : start + rows] = values[indices].mean(axis=1)
+    return means
+
+
+def bootstrap_ci(values, confidence=0.95, n_resamples=1000, seed=42, batch_size=None):
+    """Percentile bootstrap confidence interval of the mean of values, e.g. MAP@k
+
+    :return: mean, low, high
+    """
+    if not len(values):
+        return np.nan, np.nan, np.nan
+    means = resample_means(values, n_resamples, seed=seed, batch_size=batch_size)
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(means, [tail, 1 - tail])
+    return np.mean(values), low, high
+
+
+def jackknife_ci(values, confidence=0.95):
+    """Normal confidence interval of the mean of values with the jackknife standard
+    error, computed from all leave-one-out means at once
+
+    :return: mean, low, high
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 2:
+        return np.nan, np.nan, np.nan
+    leave_one_out = (values.sum() - values) / (n - 1)
+    se = np.sqrt((n - 1) / n * np.sum((leave_one_out - leave_one_out.mean()) ** 2))
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    mean = np.mean(values)
+    return mean, mean - z * se, mean + z * se
+
+
+def paired_difference_ci(values_a, values_b, confidence=0.95, **kwargs):
+    """Bootstrap confidence interval of mean(values_a) - mean(values_b) when both hold
+    scores of the same customers in the same order (e.g. AP@k of two models). Each
+    resample draws the same customers for both, so the interval excludes 0 only if
+    the difference is unlikely to be noise.
+
+    :return: difference, low, high
+    """
+    values_a = np.asarray(values_a, dtype=float)
+    values_b = np.asarray(values_b, dtype=float)
+    if values_a.shape != values_b.shape:
+        raise ValueError("paired scores must have the same shape")
+    return bootstrap_ci(values_a - values_b, confidence=confidence, **kwargs)
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from hmcollab import directories
+
+CACHE_SUFFIX = ".cache.pkl"
+
+# Pickled frames can only be read back by the versions that wrote them
+LIBRARY_VERSIONS = (pd.__version__, np.__version__)
+
+# Errors of pickle.load on a truncated file or on a frame pickled by other versions
+READ_ERRORS = (
+    OSError,
+    EOFError,
+    pickle.UnpicklingError,
+    AttributeError,
+    ImportError,
+    TypeError,
+    ValueError,
+)
+
+
+def cache_directory():
+    """Default directory of the caches, so nothing is written beside the csv files
+    (e.g. into the package's testdata)"""
+    return directories.cache("csv")
+
+
+def cache_filename(filename, directory=None):
+    """Cache of filename in directory (default: cache_directory()). The name includes
+    a digest of the absolute path, so csv files with the same name do not collide."""
+    if directory is None:
+        directory = cache_directory()
+    digest = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()[:16]
+    name = "{}-{}{}".format(os.path.basename(filename), digest, CACHE_SUFFIX)
+    return os.path.join(directory, name)
+
+
+def stamp(filename):
+    """Size and modification time of a file, used to decide whether a cache is stale"""
+    stat = os.stat(filename)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def cache_stamp(filename):
+    """stamp of filename and the pandas and numpy versions that pickle the cache"""
+    return stamp(filename) + LIBRARY_VERSIONS
+
+
+def read_cache(filename, directory=None):
+    """Return the cached frame for filename, or None if there is no valid cache.
+    The stamp is pickled ahead of the frame, so a stale cache is rejected
+    without reading the frame itself."""
+    cached = cache_filename(filename, directory)
+    if not os.path.exists(cached):
+        return None
+    try:
+        with open(cached, "rb") as f:
+            if pickle.load(f) != cache_stamp(filename):
+                return None
+            return pickle.load(f)
+    except READ_ERRORS:
+        return None
+
+
+def write_cache(filename, df, directory=None):
+    """Write the cache of filename. Failures (e.g. a read only cache directory) are
+    ignored, since the cache is only an optimization."""
+    cached = cache_filename(filename, directory)
+    partial = cached + ".partial"
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        with open(partial, "wb") as f:
+            pickle.dump(cache_stamp(filename), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, cached)
+    except OSError:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def read_cached(filename, reader, directory=None):
+    """Read filename with reader(filename), serving the result from a typed binary
+    cache in directory (default: cache_directory()) once it has been parsed"""
+    df = read_cache(filename, directory)
+    if df is None:
+        df = reader(filename)
+        write_cache(filename, df, directory)
+    return df
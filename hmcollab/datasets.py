@@ -1,36 +1,131 @@
+from functools import cached_property, partial
+
 import numpy as np
 import pandas as pd
 
 import hmcollab.splitter
 from .directory_tree import HMDatasetDirectoryTree
+from .encoding import DatasetIds, IdDictionary, RelevantCodes
 from .three_part_dataset import ThreePartDataset
+from .time_index import TimeIndex
+from .transaction_store import TransactionStore
+from .views import LazyViews, RowView, ViewAttribute
 
 
-def target_to_relevant(trans_y):
-    """Convert to dataframe of customers with a list of transactions from the input set"""
-
-    def relevant_dict(tup):
-        return " ".join(tup[1].loc[:, "article_id"].tolist())
+def target_to_relevant(trans_y, ids=None, as_codes=False):
+    """Convert to dataframe of customers with a list of transactions from the input set.
+    If ids (DatasetIds) are given, trans_y holds encoded ids and the relevant set is
+    decoded to string ids. trans_y may also be a TransactionStore.
 
-    grouped = trans_y.loc[:, ["customer_id", "article_id"]].groupby(["customer_id"])
-    by_row = {t[0]: relevant_dict(t) for t in grouped}
-    relevant_set = pd.DataFrame.from_dict(by_row, orient="index", columns=["target"])
-    relevant_set.reset_index(inplace=True)
-    relevant_set.rename(columns={"index": "customer_id"}, inplace=True)
+    :param as_codes: return RelevantCodes (article codes per customer in CSR form)
+        instead of a dataframe of space separated article ids
+    """
+    if isinstance(trans_y, TransactionStore):
+        return trans_y.to_relevant(as_codes=as_codes)
+    if as_codes:
+        if ids is None:
+            ids = DatasetIds(
+                IdDictionary(trans_y.customer_id.values),
+                IdDictionary(trans_y.article_id.values),
+            )
+            trans_y = ids.encode_frame(trans_y.loc[:, ["customer_id", "article_id"]])
+        return RelevantCodes.from_codes(
+            trans_y.customer_id.values, trans_y.article_id.values, ids
+        )
 
+    articles = trans_y.article_id
+    if ids is not None:
+        # codes sort like the ids they stand for, so grouping by code keeps the order
+        articles = pd.Series(ids.articles.decode(articles.values), index=trans_y.index)
+    relevant_set = (
+        articles.groupby(trans_y.customer_id.values, sort=True)
+        .agg(" ".join)
+        .rename("target")
+        .rename_axis("customer_id")
+        .reset_index()
+    )
+    if ids is not None:
+        relevant_set["customer_id"] = ids.customers.decode(relevant_set.customer_id)
     return relevant_set
 
 
+def relevant_windows(transactions_df, windows, time_index=None, as_codes=False):
+    """Relevant sets of several target windows, all cut from one TimeIndex.
+
+    :param windows: (offset, horizon) pairs in days. (0, 7) is the target of
+        Target(transactions_df, days=7) and (7, 7) the 7 days before it; windows
+        (offset, horizon) and (offset + horizon, horizon) never overlap. See
+        TimeIndex.window.
+    :return: dict of relevant sets (see target_to_relevant) keyed by window
+    """
+    if time_index is None:
+        time_index = TimeIndex(transactions_df)
+    df = time_index.df
+    windows = list(windows)
+    positions = [time_index.window(offset, horizon) for offset, horizon in windows]
+    if as_codes:
+        relevant_sets = [
+            target_to_relevant(df.iloc[p], as_codes=True) for p in positions
+        ]
+    else:
+        relevant_sets = hmcollab.splitter.relevant_by_fold(df, positions)
+    return dict(zip(windows, relevant_sets))
+
+
 class Target:
-    def __init__(self, transactions_df, days=7):
+    """Split of transactions into the last days (y) and everything before (x). Each
+    part and the relevant set are computed on first access."""
+
+    def __init__(self, transactions_df, days=7, ids=None, time_index=None):
         self.transactions = transactions_df
-        self.transactions_x, self.transactions_y = hmcollab.splitter.split_by_time(
-            self.transactions, days=days
-        )
-        self.relevant_set = target_to_relevant(self.transactions_y)
+        self.days = days
+        self.ids = ids
+        self._time_index = time_index
+
+    @cached_property
+    def _split(self):
+        time_index = self._time_index
+        if time_index is None:
+            time_index = TimeIndex(self.transactions)
+        return time_index.split(self.days)
+
+    @property
+    def time_index_x(self):
+        return self._split[0]
+
+    @property
+    def time_index_y(self):
+        return self._split[1]
+
+    @property
+    def transactions_x(self):
+        return self.time_index_x.df
+
+    @property
+    def transactions_y(self):
+        return self.time_index_y.df
+
+    @cached_property
+    def relevant_set(self):
+        return target_to_relevant(self.transactions_y, ids=self.ids)
 
 
 class HMDataset(ThreePartDataset):
+    """Transactions split into folds. The folds (transactions_x, train_x, test_y, ...)
+    are RowViews over self.transactions, materialized as DataFrames on first access
+    and kept. Folds and the relevant set are computed on first use; see
+    materialize()."""
+
+    transactions_x = ViewAttribute()
+    transactions_y = ViewAttribute()
+    train_x = ViewAttribute()
+    train_y = ViewAttribute()
+    train_vy = ViewAttribute()
+    val_x = ViewAttribute()
+    val_y = ViewAttribute()
+    test_x = ViewAttribute()
+    test_y = ViewAttribute()
+
     def __init__(
         self,
         threepartdataset=None,
@@ -42,10 +137,12 @@ class HMDataset(ThreePartDataset):
         folds="twosets",
         prune=False,
     ):
+        ids = None
         if threepartdataset is not None:
             articles = threepartdataset.articles
             customers = threepartdataset.customers
             transactions = threepartdataset.transactions
+            ids = threepartdataset.ids
             relevant_set = None
 
         if articles is None:
@@ -54,60 +151,135 @@ class HMDataset(ThreePartDataset):
             self.tree = tree
             articles, customers, transactions, relevant_set = tree.load()
 
-        ThreePartDataset.__init__(self, articles, customers, transactions, prune=prune)
-
-        target = Target(self.transactions)
-        self.transactions_x, self.transactions_y = (
-            target.transactions_x,
-            target.transactions_y,
+        ThreePartDataset.__init__(
+            self, articles, customers, transactions, prune=prune, ids=ids
         )
 
-        if relevant_set is None:
-            relevant_set = target.relevant_set
-        self.relevant_set = relevant_set
+        self.folds = folds
+        self.views = LazyViews(self._view_builders())
+        if relevant_set is not None:
+            self.relevant_set = relevant_set
+
+    def materialize(self):
+        """Compute every fold and the relevant set now rather than on first access"""
+        for name in self.views.builders:
+            self.views[name]
+        self.relevant_set
+        return self
 
-        if folds == "twosets":
+    @cached_property
+    def relevant_set(self):
+        return target_to_relevant(self.transactions_y, ids=self.ids)
+
+    @cached_property
+    def _cutoff(self):
+        return self.time_index.cutoff(7)
+
+    @cached_property
+    def _target_views(self):
+        # Same split as Target(self.transactions)
+        older, newer = self.time_index.partition([self._cutoff])
+        return RowView(self.transactions, older), RowView(self.transactions, newer)
+
+    @cached_property
+    def _customer_masks(self):
+        """Mask over self.transactions for the customers of each fold"""
+        if self.folds == "twosets":
             ids_train, ids_test = hmcollab.splitter.split_ids(
                 self.transactions, fraction=0.2
             )
-            self.train_x, self.test_x = hmcollab.splitter.transactions_train_test(
-                self.transactions_x, ids_train, ids_test
-            )
-            self.train_y, self.test_y = hmcollab.splitter.transactions_train_test(
-                self.transactions_y, ids_train, ids_test
-            )
+            in_train, in_test = self._has_customer(ids_train, ids_test)
+            return {"train": in_train, "test": in_test}
 
-        if folds == "threesets":
+        if self.folds == "threesets":
             # Train: 60%, val: 20%, test: 20%
             # Creating test set
             random_state = np.random.RandomState(42)
             ids_train, ids_test = hmcollab.splitter.split_ids(
                 self.transactions, fraction=0.2, random_state=random_state
             )
-            train_x, self.test_x = hmcollab.splitter.transactions_train_test(
-                self.transactions_x, ids_train, ids_test
-            )
-            train_y, self.test_y = hmcollab.splitter.transactions_train_test(
-                self.transactions_y, ids_train, ids_test
-            )
+            in_train, in_test = self._has_customer(ids_train, ids_test)
+            train_x = self.views["transactions_x"].where(in_train)
             # Creating training and validation sets
             ids_train, ids_val = hmcollab.splitter.split_ids(
-                train_x, fraction=0.25, random_state=random_state
+                pd.DataFrame({"customer_id": train_x.column("customer_id")}),
+                fraction=0.25,
+                random_state=random_state,
             )  # 25% of training is 20% from the total: 80(.25)=20
-            self.train_x, self.val_x = hmcollab.splitter.transactions_train_test(
-                train_x, ids_train, ids_val
-            )
-            self.train_y, self.val_y = hmcollab.splitter.transactions_train_test(
-                train_y, ids_train, ids_val
-            )
+            # training and validation customers are all training customers, so their
+            # masks need not be combined with in_train
+            in_train, in_val = self._has_customer(ids_train, ids_val)
+            return {"train": in_train, "val": in_val, "test": in_test}
 
-        if folds == "standard":
-            # Splitting by leave last week. Note that train_x is used to train all (train, validations and test)
-            # train_vy is the target variable for validation to use with train data
-            self.train_y = self.transactions_y
-            self.train_x, self.train_vy = hmcollab.splitter.split_by_time(
-                self.transactions_x, days=7
-            )
+        if self.folds == "hashsets":
+            # Train: 60%, val: 20%, test: 20%, by a seeded hash of each customer id
+            customer_hash = hmcollab.splitter.CustomerHash([0.6, 0.2, 0.2], seed=42)
+            labels = customer_hash.dataset_labels(self, self.transactions.customer_id)
+            return {"train": labels == 0, "val": labels == 1, "test": labels == 2}
+
+    @cached_property
+    def _standard_views(self):
+        # Splitting by leave last week. Note that train_x is used to train all (train, validations and test)
+        # train_vy is the target variable for validation to use with train data.
+        # Same split as split_by_time(self.transactions_x, days=7)
+        validation_cutoff = self.time_index.last_day_before(self._cutoff) - 7
+        oldest, middle, _ = self.time_index.partition([validation_cutoff, self._cutoff])
+        return RowView(self.transactions, oldest), RowView(self.transactions, middle)
+
+    def _view_builders(self):
+        builders = {
+            "transactions_x": lambda: self._target_views[0],
+            "transactions_y": lambda: self._target_views[1],
+        }
+
+        def by_customer(name, fold):
+            x = self.views[name]
+            return x.where(self._customer_masks[fold])
+
+        if self.folds in ["twosets", "threesets", "hashsets"]:
+            folds = ["train", "test"]
+            if self.folds != "twosets":
+                folds = ["train", "val", "test"]
+            for fold in folds:
+                builders[fold + "_x"] = partial(by_customer, "transactions_x", fold)
+                builders[fold + "_y"] = partial(by_customer, "transactions_y", fold)
+
+        if self.folds == "standard":
+            builders["train_x"] = lambda: self._standard_views[0]
+            builders["train_vy"] = lambda: self._standard_views[1]
+            builders["train_y"] = lambda: self.views["transactions_y"]
+
+        return builders
+
+    def _has_customer(self, *customer_ids):
+        """For each collection of customer ids, a mask over self.transactions that is
+        True for the transactions of those customers"""
+        customer_id = self.transactions.customer_id
+        return [customer_id.isin(ids).values for ids in customer_ids]
+
+    def memory_report(self):
+        """Bytes held by this dataset: each table, the time index and the row
+        positions of each fold"""
+        report = {}
+        for name in ["articles", "customers", "transactions", "relevant_set"]:
+            # the relevant set may not have been computed yet
+            df = self.__dict__.get(name)
+            report[name] = 0 if df is None else int(df.memory_usage(deep=True).sum())
+        time_index = self.time_index
+        report["time_index"] = (
+            time_index.day.nbytes
+            + time_index.order.nbytes
+            + time_index.sorted_day.nbytes
+        )
+        report["frames"] = 0
+        for name, view in self.views.items():
+            report[name] = view.nbytes
+            # folds that were accessed also hold their materialized frame
+            df = self.__dict__.get(name)
+            if df is not None:
+                report["frames"] += int(df.memory_usage(deep=True).sum())
+        report["total"] = sum(report.values())
+        return report
 
 
 class HMDatasetTwoSets(HMDataset):
@@ -158,6 +330,30 @@ class HMDatasetThreeSets(HMDataset):
         )
 
 
+class HMDatasetHashSets(HMDataset):
+    def __init__(
+        self,
+        threepartdataset=None,
+        tree=None,
+        articles=None,
+        customers=None,
+        transactions=None,
+        relevant_set=None,
+        prune=False,
+    ):
+        HMDataset.__init__(
+            self,
+            threepartdataset=threepartdataset,
+            tree=tree,
+            articles=articles,
+            customers=customers,
+            transactions=transactions,
+            relevant_set=relevant_set,
+            folds="hashsets",
+            prune=prune,
+        )
+
+
 class HMDatasetStandard(HMDataset):
     def __init__(
         self,
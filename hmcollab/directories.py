@@ -17,6 +17,18 @@ def base(filename=None):
     return qualifyname(basepath, filename)
 
 
+def cache(filename=None):
+    """User cache directory for derived files, outside the package and data trees:
+    $HMCOLLAB_CACHE, else $XDG_CACHE_HOME/hmcollab, else ~/.cache/hmcollab"""
+    cachepath = os.environ.get("HMCOLLAB_CACHE")
+    if not cachepath:
+        user_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        cachepath = os.path.join(user_cache, "hmcollab")
+    return qualifyname(cachepath, filename)
+
+
 def tests(filename=None):
     return qualifyname(os.path.join(code(), "tests"), filename)
 
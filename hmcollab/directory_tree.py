@@ -1,8 +1,16 @@
+import json
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 
+import numpy as np
 import pandas as pd
 
+from hmcollab import csv_cache
 from hmcollab import directories
+from hmcollab.image_manifest import ImageManifest
+from hmcollab.transaction_store import TransactionStore
 
 
 def read_with_article_id(filename):
@@ -14,11 +22,91 @@ def read_with_article_id(filename):
     )
 
 
+def read_transactions_slice(
+    filename,
+    start=None,
+    end=None,
+    customer_ids=None,
+    columns=None,
+    chunksize=1000000,
+    customer_filter=None,
+):
+    """Read the transactions with start <= t_dat < end, optionally only for the given
+    customers and columns. The file is filtered chunk by chunk, so peak memory is
+    bounded by chunksize plus the size of the result.
+
+    :param start: First date to keep (anything pd.Timestamp accepts). None for no bound
+    :param end: Date after the last date to keep. None for no bound
+    :param customer_ids: Collection of customer ids to keep. None for all customers
+    :param columns: List of columns to return. None for all columns
+    :param customer_filter: Function from an array of customer ids to a boolean mask
+        of the rows to keep, e.g. membership in a splitter.CustomerHash fold
+    :return: The rows and columns of read_with_article_id(filename) in the slice,
+        keeping their row labels
+    """
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(list(columns) + ["t_dat", "customer_id"]))
+    # t_dat is an ISO formatted date, so string comparison is date comparison
+    if start is not None:
+        start = pd.Timestamp(start).strftime("%Y-%m-%d")
+    if end is not None:
+        end = pd.Timestamp(end).strftime("%Y-%m-%d")
+    if customer_ids is not None:
+        customer_ids = pd.Index(list(customer_ids))
+
+    chunks = []
+    reader = pd.read_csv(
+        filename,
+        dtype={
+            "article_id": object,
+        },
+        usecols=usecols,
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        keep = np.ones(chunk.shape[0], dtype=bool)
+        if start is not None:
+            keep &= (chunk.t_dat >= start).values
+        if end is not None:
+            keep &= (chunk.t_dat < end).values
+        if customer_ids is not None:
+            keep &= chunk.customer_id.isin(customer_ids).values
+        if customer_filter is not None:
+            keep &= customer_filter(chunk.customer_id.values)
+        chunks.append(chunk.loc[keep, :])
+    df = pd.concat(chunks)
+    if columns is not None:
+        df = df.loc[:, list(columns)]
+    return df
+
+
+def read_articles(filename):
+    return pd.read_csv(
+        filename,
+        dtype={
+            "article_id": object,
+            "product_code": object,
+            "colour_group_code": object,
+        },
+    )
+
+
 class HMDatasetDirectoryTree:
-    def __init__(self, base=None):
+    def __init__(self, base=None, cache=True, cache_directory=None):
+        """
+        :param base: Directory containing the csv files. Defaults to directories.data()
+        :param cache: If True, each csv is parsed once and later loads are served
+            from a binary cache (see csv_cache)
+        :param cache_directory: Directory of the binary caches. Defaults to
+            csv_cache.cache_directory(), in the user cache directory, so the data
+            directory (or the package's testdata) is never written to
+        """
         if base is None:
             base = directories.data()
         self._base = base
+        self.cache = cache
+        self.cache_directory = cache_directory
 
     def path(self, filename=None):
         return directories.qualifyname(self._base, filename)
@@ -38,6 +126,33 @@ class HMDatasetDirectoryTree:
     def transactions(self):
         return self.path("transactions_train.csv")
 
+    @property
+    def transaction_store(self):
+        return self.path("transaction_store")
+
+    @property
+    def transaction_store_exists(self):
+        return os.path.exists(self.transaction_store)
+
+    @property
+    def transaction_store_stamp(self):
+        return os.path.join(self.transaction_store, "stamp.json")
+
+    @property
+    def transaction_store_is_current(self):
+        """True if the store was completely built from the current transactions csv.
+        A store without its csv is used as is."""
+        if not self.transaction_store_exists:
+            return False
+        if not os.path.exists(self.transactions):
+            return True
+        try:
+            with open(self.transaction_store_stamp) as f:
+                built_from = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return built_from == list(csv_cache.stamp(self.transactions))
+
     @property
     def transactions_y_by_customer(self):
         return self.path("target_set_7d_75481u.csv")
@@ -53,32 +168,133 @@ class HMDatasetDirectoryTree:
         dir = self.images(prefix)
         return os.path.join(dir, filename)
 
+    def _read(self, filename, reader):
+        if self.cache:
+            return csv_cache.read_cached(filename, reader, self.cache_directory)
+        return reader(filename)
+
+    @property
+    def image_manifest(self):
+        return self.path("image_manifest.npz")
+
+    def build_image_manifest(self, max_workers=16):
+        manifest = ImageManifest.build(self.images(), max_workers=max_workers)
+        manifest.save(self.image_manifest)
+        return manifest
+
+    def load_image_manifest(self):
+        """Load the index of article images, scanning the images directory first if
+        the index has not been built yet"""
+        if not os.path.exists(self.image_manifest):
+            return self.build_image_manifest()
+        return ImageManifest.load(self.image_manifest)
+
     def load_articles(self):
-        return pd.read_csv(
-            self.articles,
-            dtype={
-                "article_id": object,
-                "product_code": object,
-                "colour_group_code": object,
-            },
-        )
+        return self._read(self.articles, read_articles)
 
     def load_customers(self):
-        return pd.read_csv(self.customers)
+        return self._read(self.customers, pd.read_csv)
 
     def load_transactions(self):
-        return read_with_article_id(self.transactions)
+        return self._read(self.transactions, read_with_article_id)
 
-    def load_relevant(self):
-        return read_with_article_id(self.transactions_y_by_customer)
+    def load_transactions_slice(
+        self,
+        start=None,
+        end=None,
+        customer_ids=None,
+        columns=None,
+        chunksize=1000000,
+        customer_filter=None,
+    ):
+        """Load only the transactions in [start, end) for the given customers and
+        columns. See read_transactions_slice."""
+        return read_transactions_slice(
+            self.transactions,
+            start=start,
+            end=end,
+            customer_ids=customer_ids,
+            columns=columns,
+            chunksize=chunksize,
+            customer_filter=customer_filter,
+        )
 
-    def load(self):
-        articles = self.load_articles()
-        customers = self.load_customers()
+    def build_transaction_store(self):
+        """Build the store in a temporary directory stamped with the size and
+        modification time of the csv, then move it into place, so an interrupted
+        build never leaves a partial store behind"""
+        built_from = csv_cache.stamp(self.transactions)
+        store = TransactionStore.from_frame(self.load_transactions())
+        partial = self.transaction_store + ".partial"
+        if os.path.exists(partial):
+            shutil.rmtree(partial)
+        store.save(partial)
+        with open(os.path.join(partial, "stamp.json"), "w") as f:
+            json.dump(list(built_from), f)
+        if self.transaction_store_exists:
+            # os.replace can not replace a directory that is not empty
+            stale = self.transaction_store + ".stale"
+            if os.path.exists(stale):
+                shutil.rmtree(stale)
+            os.replace(self.transaction_store, stale)
+            os.replace(partial, self.transaction_store)
+            shutil.rmtree(stale)
+        else:
+            os.replace(partial, self.transaction_store)
+        return store
+
+    def load_transaction_store(self, mmap_mode="r"):
+        """Open the binary transaction store, building it first if it is missing or
+        was built from another version of the transactions csv"""
+        if not self.transaction_store_is_current:
+            self.build_transaction_store()
+        return TransactionStore.load(self.transaction_store, mmap_mode=mmap_mode)
+
+    def load_relevant(self):
+        return self._read(self.transactions_y_by_customer, read_with_article_id)
 
-        relevant_set = None
-        transactions = self.load_transactions()
+    def load_relevant_if_exists(self):
         if self.transactions_y_by_customer_exists:
-            relevant_set = self.load_relevant()
+            return self.load_relevant()
+
+    def load(self, parallel=False):
+        """Load articles, customers, transactions and the relevant set (None if there is
+        no relevant set file). If parallel is True, the files are parsed concurrently
+        in a thread pool."""
+        loaders = [
+            self.load_articles,
+            self.load_customers,
+            self.load_transactions,
+            self.load_relevant_if_exists,
+        ]
+        if parallel:
+            with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+                futures = [executor.submit(loader) for loader in loaders]
+                return tuple(future.result() for future in futures)
+        return tuple(loader() for loader in loaders)
+
+    def lazy(self):
+        return LazyDataset(self)
+
+
+class LazyDataset:
+    """Tables of a HMDatasetDirectoryTree, each loaded on first access"""
+
+    def __init__(self, tree: HMDatasetDirectoryTree):
+        self.tree = tree
+
+    @cached_property
+    def articles(self):
+        return self.tree.load_articles()
+
+    @cached_property
+    def customers(self):
+        return self.tree.load_customers()
+
+    @cached_property
+    def transactions(self):
+        return self.tree.load_transactions()
 
-        return articles, customers, transactions, relevant_set
+    @cached_property
+    def relevant_set(self):
+        return self.tree.load_relevant_if_exists()
@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+
+class IdDictionary:
+    """Sorted dictionary of string ids. An id is encoded as its int32 position in the
+    dictionary, so codes sort in the same order as the ids they stand for.
+
+    A dictionary can also be backed by a sorted array of utf-8 encoded ids (see
+    from_bytes), e.g. memory-mapped from a TransactionStore. Then ids are only
+    decoded to strings when they are looked up or decoded."""
+
+    def __init__(self, ids):
+        ids = pd.unique(np.asarray(ids, dtype=object))
+        self._ids = pd.Index(ids, dtype=object).sort_values()
+        self.words = None
+
+    @classmethod
+    def from_bytes(cls, words):
+        """Dictionary of a sorted array of fixed-width utf-8 ids (numpy S dtype),
+        used as is, without copying it"""
+        dictionary = cls.__new__(cls)
+        dictionary._ids = None
+        dictionary.words = words
+        return dictionary
+
+    @property
+    def ids(self):
+        """pd.Index of the ids, decoded on first use for a bytes backed dictionary"""
+        if self._ids is None:
+            self._ids = pd.Index(self._decode_words(self.words), dtype=object)
+        return self._ids
+
+    def to_bytes(self) -> np.array:
+        """Sorted utf-8 encoded ids as a fixed-width numpy S array"""
+        if self.words is not None:
+            return self.words
+        return np.char.encode(self.ids.values.astype(str), "utf-8")
+
+    @staticmethod
+    def _decode_words(words):
+        return np.char.decode(np.asarray(words), "utf-8").astype(object)
+
+    def __len__(self):
+        if self._ids is None:
+            return len(self.words)
+        return len(self._ids)
+
+    def encode(self, ids) -> np.array:
+        """int32 codes for ids. Ids missing from the dictionary are encoded as -1"""
+        if self._ids is not None:
+            return self._ids.get_indexer(np.asarray(ids, dtype=object)).astype(np.int32)
+        words = np.char.encode(np.asarray(ids, dtype=object).astype(str), "utf-8")
+        codes = np.searchsorted(self.words, words).astype(np.int32)
+        if not len(self.words):
+            return np.full(codes.shape, -1, dtype=np.int32)
+        found = codes < len(self.words)
+        found[found] = self.words[codes[found]] == words[found]
+        codes[~found] = -1
+        return codes
+
+    def decode(self, codes) -> np.array:
+        """ids of codes. Codes of missing ids (-1) are decoded as None"""
+        codes = np.asarray(codes, dtype=np.int64)
+        if self._ids is not None:
+            ids = self._ids.values[codes]
+        else:
+            ids = self._decode_words(self.words[codes])
+        ids[codes < 0] = None
+        return ids
+
+
+class DatasetIds:
+    """Customer and article dictionaries shared by a dataset and every split made from it"""
+
+    def __init__(self, customers: IdDictionary, articles: IdDictionary):
+        self.customers = customers
+        self.articles = articles
+
+    @classmethod
+    def from_tables(cls, articles, customers, transactions):
+        customer_ids = np.concatenate(
+            [customers.customer_id.values, transactions.customer_id.values]
+        )
+        article_ids = np.concatenate(
+            [articles.article_id.values, transactions.article_id.values]
+        )
+        return cls(IdDictionary(customer_ids), IdDictionary(article_ids))
+
+    def encode_frame(self, df):
+        """Copy of df with its customer_id and article_id columns replaced by codes"""
+        return self._convert_frame(df, self.customers.encode, self.articles.encode)
+
+    def decode_frame(self, df):
+        return self._convert_frame(df, self.customers.decode, self.articles.decode)
+
+    @staticmethod
+    def _convert_frame(df, convert_customers, convert_articles):
+        columns = {}
+        if "customer_id" in df.columns:
+            columns["customer_id"] = convert_customers(df.customer_id.values)
+        if "article_id" in df.columns:
+            columns["article_id"] = convert_articles(df.article_id.values)
+        return df.assign(**columns)
+
+
+def pair_keys(first, second) -> np.array:
+    """One int64 key per pair of int32 codes, e.g. (customer code, article code)"""
+    first = np.asarray(first, dtype=np.int64)
+    second = np.asarray(second, dtype=np.int64)
+    return (first << 32) | (second & 0xFFFFFFFF)
+
+
+def isin_sorted(values, sorted_values) -> np.array:
+    """np.isin(values, sorted_values) for ascending sorted_values, by binary search
+    instead of sorting sorted_values again"""
+    values = np.asarray(values)
+    if not len(sorted_values):
+        return np.zeros(values.shape, dtype=bool)
+    positions = np.searchsorted(sorted_values, values)
+    positions[positions == len(sorted_values)] = 0
+    return sorted_values[positions] == values
+
+
+def is_encoded(ids) -> bool:
+    """True if ids are integer codes rather than string ids"""
+    return np.asarray(ids).dtype.kind in "iu"
+
+
+class RelevantCodes:
+    """Article codes of each customer in CSR form: the articles of customers[i] are
+    values[offsets[i]:offsets[i + 1]]. Customer and article codes index into ids."""
+
+    def __init__(self, customers, offsets, values, ids: DatasetIds):
+        self.customers = customers
+        self.offsets = offsets
+        self.values = values
+        self.ids = ids
+        self._keys = None
+
+    @classmethod
+    def from_codes(cls, customer, article, ids: DatasetIds):
+        """Group article codes by customer code, keeping the row order within each
+        customer"""
+        customer = np.asarray(customer)
+        order = np.argsort(customer, kind="stable")
+        customers, counts = np.unique(customer[order], return_counts=True)
+        offsets = np.zeros(len(customers) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(customers, offsets, np.asarray(article)[order], ids)
+
+    @classmethod
+    def from_frame(cls, relevant, ids: DatasetIds):
+        """Codes of a relevant set dataframe (columns: customer_id and target)"""
+        articles = relevant.target.str.split(" ")
+        lengths = articles.str.len().values
+        customer = np.repeat(ids.customers.encode(relevant.customer_id.values), lengths)
+        return cls.from_codes(
+            customer, ids.articles.encode(np.concatenate(articles.values)), ids
+        )
+
+    def __len__(self):
+        return len(self.customers)
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def articles(self, i):
+        return self.values[self.offsets[i] : self.offsets[i + 1]]
+
+    def keys(self) -> np.array:
+        """Sorted distinct pair_keys of (customer code, article code), built once, so
+        predictions can be matched with isin_sorted. Articles missing from the
+        dictionary (-1) are left out."""
+        if self._keys is None:
+            valid = self.values >= 0
+            customer = np.repeat(self.customers, self.lengths)[valid]
+            self._keys = np.unique(pair_keys(customer, self.values[valid]))
+        return self._keys
+
+    def to_frame(self):
+        """Relevant set with string ids, as returned by datasets.target_to_relevant"""
+        articles = self.ids.articles.decode(self.values)
+        targets = [" ".join(a) for a in np.split(articles, self.offsets[1:-1])]
+        return pd.DataFrame(
+            {
+                "customer_id": self.ids.customers.decode(self.customers),
+                "target": targets,
+            }
+        )
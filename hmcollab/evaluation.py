@@ -0,0 +1,117 @@
+import numpy as np
+
+from hmcollab.encoding import DatasetIds, IdDictionary, RelevantCodes, pair_keys
+from hmcollab.scoring import ap_at_k_batch, encode_predictions, relevant_codes
+from hmcollab.similarity import flatten_lists
+
+
+class StreamingEvaluator:
+    """Ranking metrics accumulated over chunks of predictions, e.g. the batches of
+    models.recommend_batches. Only per-metric sums are kept between chunks.
+
+    As in scoring.relevant, only customers with a target are scored and the metrics @k
+    use k = the number of predictions of each customer (or k if given). map_at_k is
+    the mean of scoring.ap_at_k, up to rounding of the running sums.
+    """
+
+    METRICS = ["map_at_k", "precision_at_k", "recall_at_k", "hit_rate", "ndcg_at_k"]
+
+    def __init__(self, relevant_set, ids: DatasetIds = None, k=None):
+        """
+        :param relevant_set: DataFrame (columns: customer_id and target) or
+            RelevantCodes
+        :param ids: DatasetIds to encode the relevant set and the predictions. If
+            None, dictionaries of the customers and articles of the relevant set are
+            used; predicted articles outside of it are never relevant.
+        :param k: Only score the first k predictions of each customer
+        """
+        if not isinstance(relevant_set, RelevantCodes):
+            if ids is None:
+                articles, _ = flatten_lists(relevant_set.target.str.split(" ").values)
+                ids = DatasetIds(
+                    IdDictionary(relevant_set.customer_id.values),
+                    IdDictionary(articles),
+                )
+            relevant_set = RelevantCodes.from_frame(relevant_set, ids)
+        self.target = relevant_set
+        self.ids = relevant_set.ids
+        self.k = k
+        # the sorted keys of the target are built once here, and every chunk is
+        # matched against them by binary search
+        keys = relevant_set.keys()
+        # distinct relevant articles of each customer of the target
+        rows = np.searchsorted(relevant_set.customers, keys >> 32)
+        self.target_counts = np.bincount(rows, minlength=len(relevant_set))
+        self.count = 0
+        self.sums = dict.fromkeys(self.METRICS, 0.0)
+
+    def update(self, predicted):
+        """Add the scores of a chunk of predictions
+
+        :param predicted: DataFrame (columns: customer_id and prediction), as for
+            scoring.relevant
+        """
+        customers, articles, lengths = encode_predictions(predicted, self.ids)
+        if self.k is not None:
+            articles = articles[:, : self.k]
+            lengths = np.minimum(lengths, self.k)
+        rows = np.searchsorted(self.target.customers, customers)
+        rows[rows == len(self.target)] = 0
+        known = self.target.customers[rows] == customers
+        hits, lengths = relevant_codes(
+            customers[known], articles[known], self.target, lengths=lengths[known]
+        )
+        for name, scores in self.scores(
+            hits, lengths, articles[known], rows[known]
+        ).items():
+            self.sums[name] += scores.sum()
+        self.count += len(lengths)
+        return self
+
+    def scores(self, hits, lengths, articles, rows) -> dict:
+        """Metrics of each customer by name
+
+        :param hits: Hit matrix of the customers (see scoring.hit_matrix)
+        :param lengths: Number of predictions of each customer
+        :param articles: Predicted article codes of each customer
+        :param rows: Position of each customer in the target
+        """
+        n, k = hits.shape
+        hit_counts = hits.sum(axis=1)
+        has_predictions = lengths > 0
+        # a relevant article predicted twice is recalled and gains once, at
+        # its first position
+        keys = pair_keys(np.arange(n)[:, None], articles).ravel()
+        first = np.zeros(keys.shape, dtype=bool)
+        first[np.unique(keys, return_index=True)[1]] = True
+        first_hits = hits & first.reshape(hits.shape)
+        recalled = first_hits.sum(axis=1)
+        target_counts = self.target_counts[rows]
+
+        discounts = 1 / np.log2(np.arange(k) + 2)
+        dcg = first_hits @ discounts
+        ideal = np.minimum(target_counts, lengths)
+        idcg = np.concatenate([[1], np.cumsum(discounts)])[ideal]
+        return {
+            "map_at_k": ap_at_k_batch(hits, lengths),
+            "precision_at_k": np.divide(
+                hit_counts, lengths, out=np.zeros(n), where=has_predictions
+            ),
+            "recall_at_k": np.divide(
+                recalled, target_counts, out=np.zeros(n), where=target_counts > 0
+            ),
+            "hit_rate": (hit_counts > 0).astype(float),
+            "ndcg_at_k": np.divide(dcg, idcg, out=np.zeros(n), where=ideal > 0),
+        }
+
+    def evaluate(self, batches) -> dict:
+        """Update with every chunk of predictions in batches and return the metrics"""
+        for predicted in batches:
+            self.update(predicted)
+        return self.result()
+
+    def result(self) -> dict:
+        """Mean of each metric over the customers scored so far"""
+        if not self.count:
+            return dict.fromkeys(self.METRICS, np.nan)
+        return {name: self.sums[name] / self.count for name in self.METRICS}
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+import pandas as pd
+
+from hmcollab.csv_cache import LIBRARY_VERSIONS, READ_ERRORS
+
+CACHE_SUFFIX = ".features.pkl"
+
+# Increment when the encoding of the mungers changes, to invalidate cached matrices
+CACHE_VERSION = 1
+
+
+def fingerprint(df) -> str:
+    """Digest of the content of a DataFrame (columns and values, not the index)"""
+    digest = hashlib.sha1(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Article feature matrices (munger.x) keyed by the content of the articles frame
+    and the munger settings. The most recently used matrices are kept in memory and
+    on disk, so experiments that share a feature list encode it once.
+
+    Usage: ArticleFeatureMungerSpecificFeatures(articles, features, cache=cache)
+    """
+
+    def __init__(self, directory=None, max_entries=4, max_disk_entries=32):
+        """
+        :param directory: Directory for the on-disk cache, e.g.
+            directories.models("feature_cache"). If None, only memory is used.
+        :param max_entries: Number of matrices kept in memory
+        :param max_disk_entries: Number of matrices kept in directory
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self._fingerprint = None, None
+
+    def fingerprint(self, df) -> str:
+        """fingerprint of df, remembered for the last frame seen"""
+        last_df, digest = self._fingerprint
+        if last_df is not df:
+            digest = fingerprint(df)
+            self._fingerprint = df, digest
+        return digest
+
+    def key(self, munger) -> str:
+        settings = [
+            CACHE_VERSION,
+            LIBRARY_VERSIONS,
+            type(munger).__name__,
+            self.fingerprint(munger.df),
+            [str(f) for f in munger.features()],
+            munger.use_article_id,
+            munger.sparse,
+            munger.encoder is not None and munger.encoder.columns,
+        ]
+        return hashlib.sha1(json.dumps(settings).encode()).hexdigest()
+
+    def lookup(self, munger):
+        """munger.x from the cache, computed with munger._to_array() on a miss"""
+        key = self.key(munger)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        x = self.read(key)
+        if x is None:
+            x = munger._to_array()
+            self.write(key, x)
+        self.entries[key] = x
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return x
+
+    def filename(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def read(self, key):
+        if self.directory is None or not os.path.exists(self.filename(key)):
+            return None
+        try:
+            with open(self.filename(key), "rb") as f:
+                x = pickle.load(f)
+            # the modification time orders the entries for eviction
+            os.utime(self.filename(key))
+            return x
+        except READ_ERRORS:
+            return None
+
+    def write(self, key, x):
+        """Write x to the directory and evict the least recently used files. Failures
+        are ignored, since the cache is only an optimization."""
+        if self.directory is None:
+            return
+        partial = self.filename(key) + ".partial"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(partial, "wb") as f:
+                pickle.dump(x, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(partial, self.filename(key))
+            self.evict()
+        except OSError:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def evict(self):
+        cached = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(CACHE_SUFFIX)
+        ]
+        cached.sort(key=lambda name: os.stat(name).st_mtime_ns, reverse=True)
+        for name in cached[self.max_disk_entries :]:
+            os.remove(name)
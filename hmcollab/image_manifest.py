@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+def scan_prefix_directory(directory):
+    """Article ids and file sizes of the images in one prefix directory (e.g. images/010)"""
+    article_ids = []
+    sizes = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".jpg") and entry.is_file():
+                article_ids.append(entry.name[: -len(".jpg")])
+                sizes.append(entry.stat().st_size)
+    return article_ids, sizes
+
+
+class ImageManifest:
+    """Index of article_id -> image file size for every image under the images directory.
+    Articles missing from the index have no image."""
+
+    def __init__(self, article_ids, sizes):
+        self.article_ids = pd.Index(np.asarray(article_ids, dtype=object))
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+
+    @classmethod
+    def build(cls, images_directory, max_workers=16):
+        """Scan the prefix directories of images_directory in a thread pool"""
+        with os.scandir(images_directory) as entries:
+            directories = [entry.path for entry in entries if entry.is_dir()]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            scans = list(executor.map(scan_prefix_directory, sorted(directories)))
+        article_ids = [i for ids, _ in scans for i in ids]
+        sizes = [size for _, sizes in scans for size in sizes]
+        return cls(article_ids, sizes)
+
+    def save(self, filename):
+        np.savez(
+            filename,
+            article_ids=self.article_ids.values.astype(str),
+            sizes=self.sizes,
+        )
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as f:
+            return cls(f["article_ids"].astype(object), f["sizes"])
+
+    def __len__(self):
+        return len(self.article_ids)
+
+    def _positions(self, article_ids):
+        return self.article_ids.get_indexer(np.asarray(article_ids, dtype=object))
+
+    def has_image(self, article_ids) -> np.array:
+        """Boolean array, True for each article with an image"""
+        return self._positions(article_ids) >= 0
+
+    def image_size(self, article_ids) -> np.array:
+        """Image sizes in bytes, -1 for articles without an image"""
+        positions = self._positions(article_ids)
+        sizes = np.append(self.sizes, -1)
+        return sizes[positions]
@@ -1,9 +1,13 @@
 import math
 import unittest
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.neighbors import NearestNeighbors
 
 from hmcollab import transactions
+from hmcollab.articles import feature_patterns
+from hmcollab.bitset import BitsetKNN
 
 
 class PopularRecommender:
@@ -20,25 +24,97 @@ class PopularRecommender:
         return top_df.article_id[: self.total_recommendations].values.tolist()
 
     def recommend_all(self, customer_list):
-        df = pd.DataFrame(columns=["prediction"], index=customer_list)
-        df["prediction"] = " ".join(self.recommend())
+        df = pd.DataFrame(
+            columns=["prediction"], index=self.dataset.customer_labels(customer_list)
+        )
+        df["prediction"] = " ".join(self.dataset.article_labels(self.recommend()))
         df = df.reset_index().rename(columns={"index": "customer_id"})
         return df
 
 
+def recommend_batches(model, customer_list, batch_size=1000, **kwargs):
+    """Yield the recommend_all frames of consecutive batches of customer_list, e.g.
+    for evaluation.StreamingEvaluator, without building one frame for all customers"""
+    for start in range(0, len(customer_list), batch_size):
+        yield model.recommend_all(customer_list[start : start + batch_size], **kwargs)
+
+
+class PatternIndex:
+    """Articles grouped by identical feature rows. Each pattern keeps its member rows
+    ranked by popularity (then by row order), so a search over the patterns can be
+    expanded to the rows of the articles."""
+
+    def __init__(self, values, popularity=None):
+        """
+        :param values: Feature rows of the articles (dense or scipy.sparse)
+        :param popularity: Number of transactions of each row. If None, the members of
+            a pattern keep their row order.
+        """
+        codes, first = feature_patterns(values)
+        self.values = values[first]
+        n = len(codes)
+        if popularity is None:
+            popularity = np.zeros(n)
+        self.members = np.lexsort((np.arange(n), -np.asarray(popularity), codes))
+        sizes = np.bincount(codes, minlength=len(first))
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def expand(self, distances, indices, k):
+        """Rows of the members of the patterns of each query (in indices), in order,
+        with the distance of their pattern, up to k rows per query"""
+        expanded_distances = []
+        expanded_indices = []
+        for d, patterns in zip(distances, indices):
+            sizes = self.offsets[patterns + 1] - self.offsets[patterns]
+            rows = np.concatenate(
+                [self.members[self.offsets[p] : self.offsets[p + 1]] for p in patterns]
+            )
+            expanded_indices.append(rows[:k])
+            expanded_distances.append(np.repeat(d, sizes)[:k])
+        return np.array(expanded_distances), np.array(expanded_indices)
+
+
 class ArticleKNN:
-    def __init__(self, dummies, k=20):
+    def __init__(
+        self, dummies, k=20, metric="euclidean", dedupe=False, popularity=None
+    ):
+        """
+        :param metric: "euclidean" for sklearn NearestNeighbors, or "hamming" or
+            "jaccard" for a brute-force search over bit-packed dummies (BitsetKNN).
+            Rows searched with a bitset metric are binarized at 0.5.
+        :param dedupe: Index the distinct feature rows (a PatternIndex) instead of
+            every article. Articles with the same features are at the same distance,
+            and nearest returns them ranked by popularity.
+        :param popularity: Number of transactions of each row of dummies, used to rank
+            the articles of a pattern when dedupe is True
+        """
         self.k = k
         if "article_id" in dummies.columns:
             dummies = dummies.drop(columns=["article_id"])
         if k < dummies.shape[0]:
             print("At ArtlicleKNN: k < n")
-        self.model = NearestNeighbors(n_neighbors=k).fit(dummies.values)
+        values = dummies.values
+        self.patterns = None
+        n_neighbors = k
+        if dedupe:
+            self.patterns = PatternIndex(values, popularity)
+            values = self.patterns.values
+            # k patterns hold at least k articles
+            n_neighbors = min(k, len(self.patterns))
+        if metric == "euclidean":
+            self.model = NearestNeighbors(n_neighbors=n_neighbors).fit(values)
+        else:
+            self.model = BitsetKNN(n_neighbors=n_neighbors, metric=metric).fit(values)
 
     def nearest(self, row=None):
         row = row.reshape((1, -1))
-
-        return self.model.kneighbors(row)
+        distances, indices = self.model.kneighbors(row)
+        if self.patterns is not None:
+            return self.patterns.expand(distances, indices, self.k)
+        return distances, indices
 
 
 def filter_articles(trans_df, threshold=50, warning=True):
@@ -59,6 +135,12 @@ def filter_articles(trans_df, threshold=50, warning=True):
     return filtered_article_id
 
 
+def article_popularity(trans_df, article_ids) -> np.array:
+    """Number of transactions of each article of article_ids"""
+    counts = trans_df.article_id.value_counts()
+    return pd.Series(np.asarray(article_ids)).map(counts).fillna(0).values
+
+
 class KnnRecommender:
     def __init__(
         self,
@@ -68,7 +150,14 @@ class KnnRecommender:
         total_recommendations=12,
         threshold=50,
         warning=True,
+        metric="euclidean",
+        dedupe=False,
     ):
+        """
+        :param metric: Distance between articles, see ArticleKNN
+        :param dedupe: Search the distinct feature rows of the articles, see
+            ArticleKNN. Articles of a pattern are ranked by their transactions.
+        """
         self.dataset = dataset
         self.full_article_dummies = full_article_dummies
         self.groups = groups
@@ -82,7 +171,16 @@ class KnnRecommender:
         self.recomendations_by_group = math.ceil(
             self.total_recommendations / self.groups
         )
-        self.model = ArticleKNN(self.filtered_dummies, k=self.recomendations_by_group)
+        popularity = None
+        if dedupe:
+            popularity = article_popularity(self.t.df, self.filtered_dummies.article_id)
+        self.model = ArticleKNN(
+            self.filtered_dummies,
+            k=self.recomendations_by_group,
+            metric=metric,
+            dedupe=dedupe,
+            popularity=popularity,
+        )
 
     def _compute_t_and_filtered_dummies(self, threshold, warning=True):
         t = transactions.TransactionsByCustomer(self.dataset.train_x)
@@ -112,7 +210,7 @@ class KnnRecommender:
                 row=one_group
             )  # same shape as filtered (with article_id)
             for r in indices[0][: self.recomendations_by_group]:
-                article_id = self.filtered_dummies.iloc[r].article_id
+                article_id = self.filtered_dummies.article_id.iloc[r]
                 recomendation_ids.append(article_id)
         return recomendation_ids
 
@@ -120,7 +218,9 @@ class KnnRecommender:
         df = pd.DataFrame(columns=["prediction"], index=customer_list)
         for c in customer_list:
             recommendations = self.recommend(c, drop_duplicates=drop_duplicates)
+            recommendations = self.dataset.article_labels(recommendations)
             df.loc[c] = {"prediction": " ".join(recommendations)}
+        df.index = self.dataset.customer_labels(df.index)
         df = df.reset_index().rename(columns={"index": "customer_id"})
         return df
 
@@ -135,6 +235,8 @@ class KnnRecommender_for3(KnnRecommender):
         threshold=50,
         split="train",
         warning=True,
+        metric="euclidean",
+        dedupe=False,
     ):
         self.split = split
         KnnRecommender.__init__(
@@ -145,6 +247,8 @@ class KnnRecommender_for3(KnnRecommender):
             total_recommendations,
             threshold,
             warning,
+            metric,
+            dedupe,
         )
 
     def _compute_t_and_filtered_dummies(self, threshold, warning=True):
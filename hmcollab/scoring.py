@@ -1,6 +1,17 @@
+import itertools
+
 import numpy as np
+import pandas as pd
 
-from hmcollab.similarity import Similarity, IdenticalSimilarity
+from hmcollab.encoding import DatasetIds, RelevantCodes, isin_sorted, pair_keys
+from hmcollab.similarity import (
+    CodedSimilarity,
+    IdenticalSimilarity,
+    Similarity,
+    compare_codes,
+    flatten_lists,
+    get_similarity,
+)
 
 
 def relevant(predicted, target, similarity: Similarity = None):
@@ -21,28 +32,167 @@ def relevant(predicted, target, similarity: Similarity = None):
     if similarity is None:
         similarity = IdenticalSimilarity()
 
-    def compare_one(p, r):
-        return similarity.compare_one(p.split(" "), r.split(" "))
-
     # Keep only customers with transactions at target set (inner)
     both = predicted.merge(target, on=["customer_id"], how="inner")
-    return both.apply(lambda x: compare_one(x.prediction, x.target), axis=1)
+    predictions = both.prediction.str.split(" ", expand=True)
+    lengths = predictions.notna().sum(axis=1).values
+    hits = similarity.compare_batch(
+        predictions.values, both.target.str.split(" ").values
+    )
+    return pd.Series([h[:n] for h, n in zip(hits, lengths)], index=both.index)
+
+
+class SimilarityEvaluator:
+    """MAP@k of the same predictions under several similarities, from one merge of
+    predictions and targets. The article ids are factorized once; each
+    CodedSimilarity then only looks up the codes of the distinct articles."""
+
+    def __init__(self, similarities, articles_df=None):
+        """
+        :param similarities: dict of Similarity by name, or list of names for
+            get_similarity (e.g. ["identical", "product_code", "department_no"])
+        :param articles_df: Articles for the column similarities named in a list
+        """
+        if not isinstance(similarities, dict):
+            similarities = {
+                name: get_similarity(name, articles_df) for name in similarities
+            }
+        self.similarities = similarities
+
+    def hit_matrices(self, predicted, target) -> dict:
+        """
+        :param predicted: DataFrame (columns: customer_id and prediction), as for relevant
+        :param target: DataFrame (columns: customer_id and target), as for relevant
+        :return: dict of (hit matrix, lengths) by similarity name, see hit_matrix
+        """
+        # Keep only customers with transactions at target set (inner)
+        both = predicted.merge(target, on=["customer_id"], how="inner")
+        predictions = both.prediction.str.split(" ", expand=True).values
+        lengths = pd.notna(predictions).sum(axis=1)
+        targets = both.target.str.split(" ").values
+        flat_targets, target_lengths = flatten_lists(targets)
+        article_codes, articles = pd.factorize(
+            np.concatenate([predictions.ravel(), flat_targets])
+        )
+        article_codes = article_codes.astype(np.int64)
+        size = predictions.size
+
+        hit_matrices = {}
+        for name, similarity in self.similarities.items():
+            if isinstance(similarity, CodedSimilarity):
+                # -1 (padding) looks up the trailing -1
+                codes = np.append(similarity.attribute_codes(articles), -1)
+                hits = compare_codes(
+                    codes[article_codes[:size]].reshape(predictions.shape),
+                    codes[article_codes[size:]],
+                    target_lengths,
+                )
+            else:
+                hits = similarity.compare_batch(predictions, targets)
+            hit_matrices[name] = hits, lengths
+        return hit_matrices
+
+    def map_at_k(self, predicted, target) -> dict:
+        """MAP@k by similarity name, equal to map_at_k(relevant(predicted, target,
+        similarity)) for each similarity"""
+        return {
+            name: np.mean(ap_at_k_batch(hits, lengths))
+            for name, (hits, lengths) in self.hit_matrices(predicted, target).items()
+        }
+
+
+def encode_predictions(predicted, ids: DatasetIds):
+    """
+    :param predicted: DataFrame (columns: customer_id and prediction), as for relevant
+    :return: Customer codes, a (customers x k) matrix of the predicted article codes
+        padded with -1, and the number of predictions of each customer
+    """
+    split = predicted.prediction.str.split(" ", expand=True)
+    lengths = split.notna().sum(axis=1).values.astype(np.int64)
+    articles = ids.articles.encode(split.values.ravel()).reshape(split.shape)
+    return ids.customers.encode(predicted.customer_id.values), articles, lengths
+
+
+def relevant_codes(customers, articles, target: RelevantCodes, lengths=None):
+    """Integer coded counterpart of relevant with IdenticalSimilarity, for all
+    customers at once.
+
+    :param customers: Customer codes of the predictions
+    :param articles: Predicted article codes (customers x k), padded with -1
+    :param target: RelevantCodes with the same dictionaries as the predictions. Its
+        keys are built on the first call and reused by later calls
+    :param lengths: Number of predictions of each customer. Defaults to the number of
+        codes that are not -1.
+    :return: Hit matrix and lengths (see hit_matrix) of the customers with a target,
+        in the order of customers
+    """
+    articles = np.asarray(articles)
+    if lengths is None:
+        lengths = (articles >= 0).sum(axis=1)
+    # Keep only customers with transactions at target set (inner)
+    keep = isin_sorted(customers, target.customers)
+    customers = np.asarray(customers)[keep]
+    articles = articles[keep]
+    hits = isin_sorted(pair_keys(customers[:, None], articles), target.keys())
+    return hits & (articles >= 0), np.asarray(lengths)[keep]
+
+
+def relevant_hits(predicted, target, ids: DatasetIds):
+    """Same matches as relevant with IdenticalSimilarity, as a hit matrix and
+    lengths for ap_at_k_batch.
+
+    :param target: DataFrame (columns: customer_id and target) or RelevantCodes
+    """
+    if not isinstance(target, RelevantCodes):
+        target = RelevantCodes.from_frame(target, ids)
+    customers, articles, lengths = encode_predictions(predicted, ids)
+    return relevant_codes(customers, articles, target, lengths=lengths)
 
 
 def precision_at_k(ranked_results):
     return sum(ranked_results) / len(ranked_results)
 
 
+def hit_matrix(ranked_results):
+    """
+    :param ranked_results: Sequence of lists of booleans, e.g. the output of relevant
+    :return: Boolean array (customers x k) of the ranked results, padded with False
+        to the longest list, and the length of each list
+    """
+    lengths = np.fromiter(
+        (len(r) for r in ranked_results), dtype=np.int64, count=len(ranked_results)
+    )
+    hits = np.zeros((len(lengths), lengths.max(initial=0)), dtype=bool)
+    hits[np.arange(hits.shape[1]) < lengths[:, None]] = np.fromiter(
+        itertools.chain.from_iterable(ranked_results), dtype=bool, count=lengths.sum()
+    )
+    return hits, lengths
+
+
+def ap_at_k_batch(hits, lengths=None):
+    """AP@k of every row of a hit matrix, equal to ap_at_k of each row.
+
+    :param hits: Boolean array (customers x k). Padding after a row's length is False.
+    :param lengths: Number of ranked results in each row. Defaults to k for all rows.
+    """
+    hits = np.asarray(hits, dtype=bool)
+    n, k = hits.shape
+    if lengths is None:
+        lengths = np.full(n, k)
+    hit_counts = np.cumsum(hits, axis=1)
+    s = np.zeros(n)
+    # add the precisions column by column, in the same order as ap_at_k
+    for i in range(k):
+        s += np.where(hits[:, i], hit_counts[:, i] / (i + 1), 0.0)
+    return np.divide(s, lengths, out=np.zeros(n), where=lengths > 0)
+
+
 def ap_at_k(ranked_results):
     count = len(ranked_results)
     if not count:
         return 0
-    s = 0
-    for i in range(len(ranked_results)):
-        if ranked_results[i]:
-            s += precision_at_k(ranked_results[: i + 1])
-    return s / count
+    return ap_at_k_batch([ranked_results])[0]
 
 
 def map_at_k(ranked_results):
-    return np.mean([ap_at_k(r) for r in ranked_results])
+    return np.mean(ap_at_k_batch(*hit_matrix(ranked_results)))
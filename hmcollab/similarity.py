@@ -1,6 +1,11 @@
+import itertools
 from abc import ABCMeta, abstractmethod
+from functools import cached_property
 
 import numpy as np
+import pandas as pd
+
+from hmcollab.encoding import pair_keys
 
 
 class Similarity(metaclass=ABCMeta):
@@ -18,20 +23,74 @@ class Similarity(metaclass=ABCMeta):
         comparisons = np.array([is_in_target(i) for i in predicted])
         return comparisons
 
+    def compare_batch(self, predicted, target) -> np.array:
+        """compare_one for many customers at once
+
+        :param predicted: Array (customers x k) of predicted article ids, padded with None
+        :param target: Sequence of lists of target article ids, one per customer
+        :return: Boolean array (customers x k), False for padding
+        """
+        predicted = np.asarray(predicted, dtype=object)
+        comparisons = np.zeros(predicted.shape, dtype=bool)
+        for row, p, t in zip(comparisons, predicted, target):
+            p = [i for i in p if i is not None]
+            row[: len(p)] = self.compare_one(p, t)
+        return comparisons
+
+
+class CodedSimilarity(Similarity):
+    """Similarity given by integer codes of the articles: two articles are similar if
+    they have the same code. Comparisons are lookups of codes and set membership."""
+
+    @abstractmethod
+    def attribute_codes(self, article_ids) -> np.array:
+        """Code of each article, -1 for articles that are similar to none. Codes only
+        need to be comparable within one call."""
+
+    def compare_one(self, predicted, target) -> np.array:
+        codes = self.attribute_codes(np.concatenate([predicted, target]))
+        target_codes = codes[len(predicted) :]
+        return np.isin(codes[: len(predicted)], target_codes[target_codes >= 0])
 
-class IdenticalSimilarity(Similarity):
+    def compare_batch(self, predicted, target) -> np.array:
+        predicted = np.asarray(predicted, dtype=object)
+        flat_target, lengths = flatten_lists(target)
+        codes = self.attribute_codes(np.concatenate([predicted.ravel(), flat_target]))
+        predicted_codes = codes[: predicted.size].reshape(predicted.shape)
+        return compare_codes(predicted_codes, codes[predicted.size :], lengths)
+
+
+class IdenticalSimilarity(CodedSimilarity):
     def similarity(self, id0, id1):
         return id0 == id1
 
+    def attribute_codes(self, article_ids) -> np.array:
+        codes, _ = pd.factorize(np.asarray(article_ids, dtype=object))
+        return codes
+
     def compare_one(self, predicted, target):
         return np.isin(predicted, target)
 
 
-class ArticleSimilarityByColumn(Similarity):
+class ArticleSimilarityByColumn(CodedSimilarity):
     def __init__(self, df, column_name):
         self.df = df
         self.column_name = column_name
 
+    @cached_property
+    def _attribute_codes(self):
+        """Index of article ids and the code of each one's column value (from its first
+        row), with a trailing -1 for ids missing from the index"""
+        first = self.df.drop_duplicates("article_id")
+        codes, _ = pd.factorize(first[self.column_name])
+        return pd.Index(first.article_id.values), np.append(codes, -1)
+
+    def attribute_codes(self, article_ids) -> np.array:
+        """Code of the column value of each article. Articles have the same code if and
+        only if they are similar. Missing articles and values are -1."""
+        index, codes = self._attribute_codes
+        return codes[index.get_indexer(np.asarray(article_ids, dtype=object))]
+
     def row_from_article_id(self, id0):
         df = self.df[self.df.article_id == id0]
         if df.shape[0]:
@@ -55,6 +114,31 @@ class ArticleSimilarityByColumn(Similarity):
         return row0[self.column_name] == row1[self.column_name]
 
 
+def flatten_lists(lists):
+    """Concatenation of lists of ids as an object array, and the length of each list"""
+    lengths = np.fromiter((len(x) for x in lists), dtype=np.int64, count=len(lists))
+    flat = np.fromiter(
+        itertools.chain.from_iterable(lists), dtype=object, count=lengths.sum()
+    )
+    return flat, lengths
+
+
+def compare_codes(predicted_codes, target_codes, target_lengths) -> np.array:
+    """
+    :param predicted_codes: Codes (customers x k) of the predicted articles
+    :param target_codes: Codes of the target articles of all customers, concatenated
+    :param target_lengths: Number of target articles of each customer
+    :return: Boolean array (customers x k), True where a predicted code is one of the
+        target codes of the same customer. Negative codes never match.
+    """
+    customers = np.repeat(np.arange(len(target_lengths)), target_lengths)
+    valid = target_codes >= 0
+    target_keys = pair_keys(customers[valid], target_codes[valid])
+    rows = np.arange(predicted_codes.shape[0])[:, None]
+    hits = np.isin(pair_keys(rows, predicted_codes), target_keys)
+    return hits & (predicted_codes >= 0)
+
+
 def get_similarity(similarity_name, articles_df):
     if similarity_name in [
         "product_code",
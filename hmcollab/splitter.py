@@ -1,4 +1,3 @@
-import datetime
 from abc import ABCMeta, abstractmethod
 
 import numpy as np
@@ -10,17 +9,82 @@ from hmcollab.three_part_dataset import (
     prune_customers,
     prune_articles,
 )
+from hmcollab.time_index import TimeIndex
+from hmcollab.transaction_store import TransactionStore
 
 
-def split_by_time(df, days):
+def split_by_time(df, days, time_index=None):
     """Split transactions dataframe by a cutoff number of days from
-    the last transaction at column t_dat"""
-    df["t_dat"] = pd.to_datetime(df["t_dat"].copy(), format="%Y-%m-%d")
-    last = df["t_dat"].max()
-    cutoff_date = last - datetime.timedelta(days=days)
-    older = df[df.t_dat < cutoff_date]
-    newer = df[df.t_dat >= cutoff_date]
-    return older, newer
+    the last transaction at column t_dat. Pass the TimeIndex of df, if there is one,
+    to avoid parsing and sorting the dates again."""
+    if isinstance(df, TransactionStore):
+        return df.split_by_time(days)
+    if time_index is None:
+        time_index = TimeIndex(df)
+    older, newer = time_index.split(days)
+    return older.df, newer.df
+
+
+def rolling_windows(
+    transactions,
+    days=7,
+    windows=4,
+    history_days=None,
+    time_index=None,
+    relevant=False,
+):
+    """Yield (history, target) transaction frames for backtesting over consecutive
+    target windows, oldest first. The target of fold i from the newest is
+    TimeIndex.window(i * days, days), so the newest pair is
+    split_by_time(transactions, days) and the targets never overlap. As with
+    split_by_time, the newest target also holds its cutoff day.
+
+    :param days: Length of each target window
+    :param windows: Number of (history, target) pairs
+    :param history_days: If None, the history is every transaction before the target
+        window (expanding window). Otherwise it is the history_days days before it
+        (sliding window).
+    :param time_index: TimeIndex of transactions, if there is one. All windows are
+        binary searches over this one index.
+    :param relevant: If True, yield (history, target, relevant set) triples. The
+        relevant sets (see datasets.target_to_relevant) of all folds are computed
+        by one groupby.
+    """
+    if time_index is None:
+        time_index = TimeIndex(transactions)
+    offsets = [i * days for i in reversed(range(windows))]
+    targets = [time_index.window(offset, days) for offset in offsets]
+    relevant_sets = relevant_by_fold(transactions, targets) if relevant else None
+    for i, offset in enumerate(offsets):
+        start = time_index.cutoff(offset + days)
+        history_start = None if history_days is None else start - history_days
+        history = time_index.positions(start=history_start, end=start)
+        fold = transactions.iloc[history], transactions.iloc[targets[i]]
+        if relevant:
+            fold += (relevant_sets[i],)
+        yield fold
+
+
+def relevant_by_fold(transactions, positions) -> list:
+    """Relevant set of the transactions at each array of positions, the same as
+    datasets.target_to_relevant(transactions.iloc[p]) for each p, from one groupby
+
+    :param positions: List of arrays of row positions, each in row order
+    """
+    if not len(positions):
+        return []
+    fold = np.repeat(np.arange(len(positions)), [len(p) for p in positions])
+    rows = np.concatenate([np.asarray(p, dtype=np.int64) for p in positions])
+    articles = pd.Series(transactions.article_id.values[rows], dtype=object)
+    grouped = articles.groupby(
+        [fold, transactions.customer_id.values[rows]], sort=True
+    ).agg(" ".join)
+    by_fold = {i: target.droplevel(0) for i, target in grouped.groupby(level=0)}
+    empty = pd.Series([], dtype=object)
+    return [
+        pd.DataFrame({"customer_id": target.index.values, "target": target.values})
+        for target in (by_fold.get(i, empty) for i in range(len(positions)))
+    ]
 
 
 def split_ids(a_set, fraction, random_state=42):
@@ -31,6 +95,50 @@ def split_ids(a_set, fraction, random_state=42):
     return ids_train, ids_test
 
 
+class CustomerHash:
+    """Assigns each customer to one of several folds by a seeded hash of its id, so a
+    customer's fold can be computed row by row (e.g. chunk by chunk while reading)
+    without collecting the unique ids first. A customer keeps its fold when the
+    dataset grows or is subsampled."""
+
+    def __init__(self, fractions, seed=42):
+        """
+        :param fractions: Fraction of customers in each fold, summing to 1
+        """
+        self.fractions = list(fractions)
+        if not self.fractions or min(self.fractions) <= 0:
+            raise ValueError("fractions must be positive")
+        if not np.isclose(sum(self.fractions), 1):
+            raise ValueError("fractions must sum to 1")
+        self.seed = seed
+        self._bounds = np.cumsum(self.fractions)[:-1]
+        # siphash key for pd.util.hash_array, which must be 16 characters
+        self._hash_key = str(seed).zfill(16)[-16:]
+
+    def __len__(self):
+        return len(self.fractions)
+
+    def uniform(self, customer_ids) -> np.array:
+        """A number in [0, 1) for each customer id, the same in every run"""
+        hashes = pd.util.hash_array(
+            np.asarray(customer_ids, dtype=object), hash_key=self._hash_key
+        )
+        return (hashes >> np.uint64(11)) * 2.0**-53
+
+    def labels(self, customer_ids) -> np.array:
+        """Fold number of each customer id"""
+        return np.searchsorted(self._bounds, self.uniform(customer_ids), side="right")
+
+    def dataset_labels(self, dataset: ThreePartDataset, customer_keys) -> np.array:
+        """Fold number of each customer key of dataset. Encoded datasets hash their
+        dictionary of string ids once, so folds do not depend on the encoding."""
+        if dataset.encoded:
+            return self.labels(dataset.ids.customers.ids.values)[
+                np.asarray(customer_keys)
+            ]
+        return self.labels(customer_keys)
+
+
 def transactions_train_test(a_set, ids_tr, ids_te):
     # a_set: transactions dataset
     train = a_set.loc[a_set.customer_id.isin(ids_tr), :]
@@ -41,35 +149,159 @@ def transactions_train_test(a_set, ids_tr, ids_te):
 class Portion(metaclass=ABCMeta):
     def split(self, dataset):
         transactions = self._get_transaction_portion(dataset)
+        return self._from_transactions(dataset, transactions)
+
+    @staticmethod
+    def _from_transactions(dataset, transactions):
         customers = prune_customers(dataset.customers, transactions=transactions)
         articles = prune_articles(dataset.articles, transactions=transactions)
-        return ThreePartDataset(articles, customers, transactions)
+        return ThreePartDataset(articles, customers, transactions, ids=dataset.ids)
 
     @abstractmethod
     def _get_transaction_portion(self, dataset):
         pass
 
 
-class OlderPortion(Portion):
+class TimePortion(Portion, metaclass=ABCMeta):
     def __init__(self, days):
         self.days = days
 
+    def split(self, dataset):
+        # the portion keeps its part of the dataset's TimeIndex, so splitting it
+        # again does not parse dates
+        time_index = self._get_time_portion(dataset)
+        portion = self._from_transactions(dataset, time_index.df)
+        portion.time_index = time_index
+        return portion
+
     def _get_transaction_portion(self, dataset):
-        older, newer = split_by_time(dataset.transactions, self.days)
-        return older
+        return self._get_time_portion(dataset).df
 
+    @abstractmethod
+    def _get_time_portion(self, dataset):
+        pass
 
-class NewerPortion(Portion):
-    def __init__(self, days):
-        self.days = days
 
-    def _get_transaction_portion(self, dataset):
-        older, newer = split_by_time(dataset.transactions, self.days)
+class OlderPortion(TimePortion):
+    def _get_time_portion(self, dataset):
+        older, newer = dataset.time_index.split(self.days)
+        return older
+
+
+class NewerPortion(TimePortion):
+    def _get_time_portion(self, dataset):
+        older, newer = dataset.time_index.split(self.days)
         return newer
 
 
+class Partitioner:
+    """Splits a dataset into partitions by time cutoffs and/or customer groups.
+
+    Every transaction is given a partition label in one vectorized pass. Partition
+    (g, t) holds the transactions of customer group g in the t-th interval between
+    the ascending day number cutoffs, and is partition[g * (len(cutoffs) + 1) + t].
+    Transactions of customers in no group belong to no partition.
+
+    Articles are pruned to those in each partition's transactions. Customers are
+    pruned to the group's customers when splitting by customer only, and to those
+    in each partition's transactions otherwise.
+    """
+
+    def __init__(self, dataset: ThreePartDataset, cutoffs=None, customer_groups=None):
+        """
+        :param cutoffs: Ascending day numbers (see TimeIndex). A transaction on the
+            cutoff day belongs to the newer interval
+        :param customer_groups: List of disjoint collections of customer ids, or a
+            CustomerHash
+        """
+        self.dataset = dataset
+        self.cutoffs = [] if cutoffs is None else list(cutoffs)
+        self.customer_groups = customer_groups
+
+        transactions = dataset.transactions
+        self.labels = np.zeros(transactions.shape[0], dtype=np.int32)
+        if self.cutoffs:
+            self.labels = np.searchsorted(
+                self.cutoffs, dataset.time_index.day, side="right"
+            ).astype(np.int32)
+        if customer_groups is not None:
+            groups = self._customer_group_labels(transactions.customer_id)
+            intervals = len(self.cutoffs) + 1
+            self.labels = np.where(groups >= 0, groups * intervals + self.labels, -1)
+
+    @property
+    def count(self):
+        groups = 1 if self.customer_groups is None else len(self.customer_groups)
+        return groups * (len(self.cutoffs) + 1)
+
+    def _customer_group_labels(self, customer_ids):
+        if isinstance(self.customer_groups, CustomerHash):
+            return self.customer_groups.dataset_labels(self.dataset, customer_ids)
+        keys = [
+            pd.unique(np.asarray(self.dataset.customer_keys(ids)))
+            for ids in self.customer_groups
+        ]
+        groups = np.repeat(np.arange(len(keys)), [len(k) for k in keys])
+        index = pd.Index(np.concatenate(keys))
+        if index.has_duplicates:
+            raise ValueError("customer groups must be disjoint")
+        groups = np.append(groups, -1)
+        return groups[index.get_indexer(customer_ids)]
+
+    def _present(self, table_ids, transaction_ids):
+        """Boolean matrix, True where a row of a table has a transaction in a partition"""
+        codes, uniques = pd.factorize(np.concatenate([table_ids, transaction_ids]))
+        table_codes = codes[: len(table_ids)]
+        transaction_codes = codes[len(table_ids) :]
+        labelled = self.labels >= 0
+        present = np.zeros((self.count, len(uniques)), dtype=bool)
+        present[self.labels[labelled], transaction_codes[labelled]] = True
+        return present[:, table_codes]
+
+    def positions(self) -> list:
+        """Positions of the transactions of each partition, in original row order"""
+        order = np.argsort(self.labels, kind="stable")
+        counts = np.bincount(self.labels[self.labels >= 0], minlength=self.count)
+        start = np.count_nonzero(self.labels < 0)
+        bounds = start + np.concatenate([[0], np.cumsum(counts)])
+        return [order[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def partition(self) -> list:
+        dataset = self.dataset
+        transactions = dataset.transactions
+        articles = self._present(
+            dataset.articles.article_id.values, transactions.article_id.values
+        )
+        if self.customer_groups is not None and not self.cutoffs:
+            groups = self._customer_group_labels(dataset.customers.customer_id)
+            customers = groups == np.arange(self.count).reshape((-1, 1))
+        else:
+            customers = self._present(
+                dataset.customers.customer_id.values, transactions.customer_id.values
+            )
+
+        partition = []
+        for i, positions in enumerate(self.positions()):
+            portion_transactions = transactions.iloc[positions]
+            portion = ThreePartDataset(
+                dataset.articles.loc[articles[i], :],
+                dataset.customers.loc[customers[i], :],
+                portion_transactions,
+                ids=dataset.ids,
+            )
+            if self.cutoffs:
+                # built over the portion's own transactions, so the portion reuses
+                # it instead of parsing dates again
+                portion.time_index = TimeIndex(
+                    portion_transactions, day=dataset.time_index.day[positions]
+                )
+            partition.append(portion)
+        return partition
+
+
 class TimeSplitStrategy:
     def __init__(self, days):
+        self.days = days
         self.newer_portion = NewerPortion(days)
         self.older_portion = OlderPortion(days)
 
@@ -78,9 +310,8 @@ class XYStrategy(TimeSplitStrategy):
     def __init__(self, dataset: ThreePartDataset, days):
         super().__init__(days)
 
-        older = self.older_portion.split(dataset)
-        newer = self.newer_portion.split(dataset)
-        self.partition = [older, newer]
+        cutoff = dataset.time_index.cutoff(days)
+        self.partition = Partitioner(dataset, cutoffs=[cutoff]).partition()
 
     @property
     def x(self):
@@ -95,11 +326,14 @@ class StandardStrategy(TimeSplitStrategy):
     def __init__(self, dataset: ThreePartDataset, days):
         super().__init__(days)
 
-        older = self.older_portion.split(dataset)
-        newer = self.newer_portion.split(dataset)
-        oldest = self.older_portion.split(older)
-        middle = self.newer_portion.split(older)
-        self.partition = [oldest, middle, newer]
+        # the validation cutoff is days before the last transaction older than the
+        # test cutoff, as if the older portion were split again
+        time_index = dataset.time_index
+        cutoff = time_index.cutoff(days)
+        validation_cutoff = time_index.last_day_before(cutoff) - days
+        self.partition = Partitioner(
+            dataset, cutoffs=[validation_cutoff, cutoff]
+        ).partition()
 
     @property
     def x(self):
@@ -119,24 +353,25 @@ class CustomerPortion(Portion):
         self.customer_ids = customer_ids
 
     def _get_transaction_portion(self, dataset):
+        customer_ids = dataset.customer_keys(self.customer_ids)
         return dataset.transactions.loc[
-            dataset.transactions.customer_id.isin(self.customer_ids), :
+            dataset.transactions.customer_id.isin(customer_ids), :
         ]
 
     def split(self, dataset: ThreePartDataset):
         transactions = self._get_transaction_portion(dataset)
-        customers = prune_customers(dataset.customers, customer_ids=self.customer_ids)
+        customers = prune_customers(
+            dataset.customers, customer_ids=dataset.customer_keys(self.customer_ids)
+        )
         articles = prune_articles(dataset.articles, transactions=transactions)
-        return ThreePartDataset(articles, customers, transactions)
+        return ThreePartDataset(articles, customers, transactions, ids=dataset.ids)
 
 
 class SplitByCustomerStrategy:
     def __init__(self, dataset: ThreePartDataset, customer_id_partition):
-        partition = []
-        for ids in customer_id_partition:
-            cp = CustomerPortion(ids)
-            partition.append(cp.split(dataset))
-        self.partition = partition
+        self.partition = Partitioner(
+            dataset, customer_groups=customer_id_partition
+        ).partition()
 
     @staticmethod
     def _get_random_state(random_state):
@@ -162,6 +397,37 @@ class SplitByCustomerTrainTestStrategy(SplitByCustomerStrategy):
         return self.partition[1]
 
 
+class SplitByCustomerHashStrategy(SplitByCustomerStrategy):
+    """Train, test and validation split by a seeded hash of the customer id (see
+    CustomerHash), with the same partition order as
+    SplitByCustomerTrainTestValidationStrategy"""
+
+    def __init__(
+        self,
+        dataset: ThreePartDataset,
+        test_fraction,
+        validation_fraction,
+        seed=42,
+    ):
+        train_fraction = 1.0 - test_fraction - validation_fraction
+        customer_hash = CustomerHash(
+            [train_fraction, test_fraction, validation_fraction], seed=seed
+        )
+        super().__init__(dataset, customer_hash)
+
+    @property
+    def train(self):
+        return self.partition[0]
+
+    @property
+    def test(self):
+        return self.partition[1]
+
+    @property
+    def validation(self):
+        return self.partition[2]
+
+
 class SplitByCustomerTrainTestValidationStrategy(SplitByCustomerStrategy):
     def __init__(
         self,
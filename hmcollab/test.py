@@ -3,25 +3,36 @@ import argparse
 import unittest
 
 from hmcollab.tests.test_articles import TestArticles
+from hmcollab.tests.test_bitset import TestBitset
+from hmcollab.tests.test_bootstrap import TestBootstrap
+from hmcollab.tests.test_csv_cache import TestCsvCache
 from hmcollab.tests.test_directory_tree import TestDirectoryTree
 from hmcollab.tests.test_directories import TestDirectories
+from hmcollab.tests.test_encoding import TestEncoding
+from hmcollab.tests.test_evaluation import TestEvaluation
 from hmcollab.tests.test_example import TestExample
 from hmcollab.tests.test_fake_data import TestFakeData
+from hmcollab.tests.test_feature_cache import TestFeatureCache
 from hmcollab.tests.test_hmdataset import TestHMDataset
+from hmcollab.tests.test_image_manifest import TestImageManifest
 from hmcollab.tests.test_knn_recommenders import TestKNNRecommenders
 from hmcollab.tests.test_package_version import TestPackage
 from hmcollab.tests.test_popular_recommender import TestPopularRecommender
 from hmcollab.tests.test_scoring import TestScoring
 from hmcollab.tests.test_similarity import TestSimilarity
 from hmcollab.tests.test_splitter import TestSplitter
+from hmcollab.tests.test_time_index import TestTimeIndex
 from hmcollab.tests.test_transactions import TestTransactions
+from hmcollab.tests.test_transaction_store import TestTransactionStore
 from hmcollab.tests.test_relevant import TestRelevant
 
 # integration tests
 from hmcollab.tests.integration_tests.integration_test_data_exists import (
     IntegrationTestDataExists,
 )
-from hmcollab.tests.integration_tests.integration_test_models import IntegrationTestModels
+from hmcollab.tests.integration_tests.integration_test_models import (
+    IntegrationTestModels,
+)
 
 
 class CountSuite(object):
@@ -39,18 +50,27 @@ def suite(integration):
     s = CountSuite()
 
     s.add(TestArticles)
+    s.add(TestBitset)
+    s.add(TestBootstrap)
+    s.add(TestCsvCache)
     s.add(TestDirectoryTree)
     s.add(TestDirectories)
+    s.add(TestEncoding)
+    s.add(TestEvaluation)
     s.add(TestExample)
     s.add(TestFakeData)
+    s.add(TestFeatureCache)
     s.add(TestHMDataset)
+    s.add(TestImageManifest)
     s.add(TestKNNRecommenders)
     s.add(TestScoring)
     s.add(TestPackage)
     s.add(TestPopularRecommender)
     s.add(TestSimilarity)
     s.add(TestSplitter)
+    s.add(TestTimeIndex)
     s.add(TestTransactions)
+    s.add(TestTransactionStore)
     s.add(TestRelevant)
 
     if integration:
@@ -1,7 +1,8 @@
 import numpy as np
 import pandas as pd
 
-from hmcollab import three_part_dataset
+from hmcollab import datasets, three_part_dataset
+from hmcollab.encoding import DatasetIds
 from hmcollab.articles import ArticleFeatureMunger
 
 
@@ -79,3 +80,37 @@ def random_dataset(n_customers=100, n_articles=100, n_transactions=1000, r=None)
     articles = articles_random_df(n_articles, r=r)
     transactions = transactions_random_df(customers, articles, n_transactions, r=r)
     return three_part_dataset.ThreePartDataset(articles, customers, transactions)
+
+
+def random_predictions(dataset, max_predictions=12, r=None):
+    """Between 1 and max_predictions random articles for each customer of dataset,
+    as a DataFrame with columns customer_id and prediction"""
+    if r is None:
+        r = np.random.RandomState(0)
+    return pd.DataFrame(
+        {
+            "customer_id": dataset.customers.customer_id,
+            "prediction": [
+                " ".join(
+                    r.choice(
+                        dataset.articles.article_id, r.randint(1, max_predictions + 1)
+                    )
+                )
+                for _ in range(dataset.customers.shape[0])
+            ],
+        }
+    )
+
+
+def random_evaluation(n_customers=100, n_articles=100, n_transactions=10000, days=20):
+    """A random dataset with its relevant set of the last days, random predictions
+    for its customers and the DatasetIds of its tables
+
+    :return: dataset, relevant set, predictions, ids
+    """
+    dataset = random_dataset(n_customers, n_articles, n_transactions)
+    target = datasets.Target(dataset.transactions, days).relevant_set
+    ids = DatasetIds.from_tables(
+        dataset.articles, dataset.customers, dataset.transactions
+    )
+    return dataset, target, random_predictions(dataset), ids
@@ -1,7 +1,11 @@
+import os
+import tempfile
 import unittest
 
 import numpy as np
+import pandas as pd
 from numpy.linalg import norm
+from scipy import sparse
 
 import hmcollab.models
 from hmcollab import directories
@@ -93,3 +97,82 @@ class TestArticles(unittest.TestCase):
 
         d, indices = knn.nearest(row)
         self.knn_test(d, indices)
+
+    def test_sparse_feature_array(self):
+        dense = self.get_simple()
+        a = articles.ArticleFeatureMungerSpecificFeatures(
+            self.articles, ["color", "article"], sparse=True
+        )
+        self.assertEqual((17, 5), a.x.shape)
+        self.assertEqual(list(dense.x.columns), a.x.columns)
+        self.assertEqual(list(self.articles.article_id), list(a.x.article_id))
+        self.assertEqual(0, norm(a.x.values.toarray() - self.simple_onehot))
+
+        subset = a.x[a.x.article_id.isin(["03", "01"])]
+        self.assertEqual(["01", "03"], list(subset.article_id))
+        self.assertEqual(
+            self.simple_onehot[[1, 3]].tolist(), subset.values.toarray().tolist()
+        )
+
+        merged = a.x.merge(pd.DataFrame({"article_id": ["03", "01", "03"]}))
+        self.assertEqual(["01", "03", "03"], list(merged.article_id))
+        with self.assertRaises(ValueError):
+            a.x.merge(merged.article_id, how="left")
+
+    def test_knn_sparse(self):
+        a = articles.ArticleFeatureMungerSpecificFeatures(
+            self.articles, ["color", "article"], sparse=True
+        )
+        knn = hmcollab.models.ArticleKNN(a.x, 4)
+        d, indices = knn.nearest(row=self.simple_onehot[10])
+        self.knn_test(d, indices)
+
+    def test_feature_encoder(self):
+        features = ["color", "article"]
+        encoder = articles.ArticleFeatureEncoder(features).fit(self.articles)
+        dense = self.get_simple()
+        self.assertEqual(list(dense.x.columns), encoder.columns)
+        self.assertTrue(dense.x.equals(encoder.transform(self.articles, False, False)))
+
+        # new articles are encoded with the fitted columns
+        new_articles = articles_random_df(30).iloc[20:].copy()
+        new_articles.loc[new_articles.index[0], "color"] = "not a color"
+        x = encoder.transform(new_articles)
+        self.assertEqual(encoder.columns, x.columns)
+        self.assertEqual([1] + [2] * 9, list(x.values.toarray().sum(axis=1)))
+
+        munger = articles.ArticleFeatureMungerSpecificFeatures(
+            new_articles, features, use_article_id=True, encoder=encoder
+        )
+        self.assertEqual(["article_id"] + encoder.columns, list(munger.x.columns))
+
+    def test_save_and_load_encoder(self):
+        encoder = articles.ArticleFeatureEncoder(["color", "article"])
+        x = encoder.fit_transform(self.articles)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "article_features.npz")
+            encoder.save(filename)
+            loaded = articles.ArticleFeatureEncoder.load(filename)
+            self.assertEqual(encoder.columns, loaded.columns)
+
+            x.save(os.path.join(directory, "article_features"))
+            actual = articles.SparseDummies.load(
+                os.path.join(directory, "article_features")
+            )
+            self.assertEqual(x.columns, actual.columns)
+            self.assertEqual(list(x.article_id), list(actual.article_id))
+            self.assertEqual(0, (x.values != actual.values).nnz)
+            self.assertFalse(actual.values.data.flags.writeable)
+
+    def test_sparse_dummies_drop_duplicates(self):
+        values = np.array([[1, 0, 2], [0, 1, 0], [1, 0, 2], [0, 0, 0], [0, 1, 0]])
+        x = articles.SparseDummies(values, ["a", "b", "c"], list("vwxyz"))
+        expected = pd.DataFrame(values, columns=x.columns).drop_duplicates()
+        actual = x.drop_duplicates()
+        self.assertEqual(expected.values.tolist(), actual.values.toarray().tolist())
+        self.assertEqual(["v", "w", "y"], list(actual.article_id))
+
+        # an explicitly stored zero does not make a row distinct
+        matrix = sparse.csr_matrix(([1, 0, 1], [0, 2, 0], [0, 2, 3]), shape=(2, 3))
+        x = articles.SparseDummies(matrix, x.columns, ["v", "w"])
+        self.assertEqual(["v"], list(x.drop_duplicates().article_id))
@@ -0,0 +1,106 @@
+import unittest
+
+import numpy as np
+from scipy import sparse
+
+from hmcollab import bitset
+
+
+class TestBitset(unittest.TestCase):
+    def setUp(self):
+        r = np.random.RandomState(42)
+        # 70 features, so rows take two words and the last one is padded
+        self.index = (r.rand(50, 70) < 0.2).astype(float)
+        self.queries = (r.rand(9, 70) < 0.2).astype(float)
+
+    def tearDown(self):
+        pass
+
+    def test_popcount(self):
+        r = np.random.RandomState(0)
+        words = r.randint(0, 2**64 - 1, size=100, dtype=np.uint64)
+        extremes = np.array([0, 2**63, 2**64 - 1], dtype=np.uint64)
+        words = np.concatenate([words, extremes])
+        self.assertEqual(np.uint64, words.dtype)
+        expected = [bin(int(w)).count("1") for w in words]
+        self.assertEqual(expected, list(bitset.popcount(words)))
+
+    def test_pack_rows(self):
+        packed = bitset.pack_rows(self.index, chunksize=7)
+        self.assertEqual((50, 2), packed.shape)
+        self.assertEqual(np.uint64, packed.dtype)
+        self.assertEqual(
+            list(self.index.sum(axis=1)), list(bitset.popcount(packed).sum(axis=1))
+        )
+        self.assertTrue(
+            np.array_equal(packed, bitset.pack_rows(sparse.csr_matrix(self.index)))
+        )
+        # feature j is bit j % 64 of word j // 64
+        row = np.zeros((1, 70))
+        row[0, 65] = 1
+        self.assertEqual([0, 2], list(bitset.pack_rows(row)[0]))
+        # values are binarized at the threshold
+        self.assertTrue(
+            np.array_equal(packed, bitset.pack_rows(self.index * 0.6 + 0.1))
+        )
+
+    def test_hamming(self):
+        actual = bitset.hamming(
+            bitset.pack_rows(self.queries), bitset.pack_rows(self.index)
+        )
+        expected = ((self.queries[:, None, :] - self.index[None, :, :]) ** 2).sum(
+            axis=2
+        )
+        self.assertTrue(np.array_equal(expected, actual))
+        # blocks of the index give the same distances
+        blocked = bitset.hamming(
+            bitset.pack_rows(self.queries), bitset.pack_rows(self.index), block_size=7
+        )
+        self.assertTrue(np.array_equal(expected, blocked))
+
+    def test_jaccard(self):
+        actual = bitset.jaccard(
+            bitset.pack_rows(self.queries), bitset.pack_rows(self.index)
+        )
+        a = self.queries[:, None, :] > 0
+        b = self.index[None, :, :] > 0
+        expected = 1 - (a & b).sum(axis=2) / (a | b).sum(axis=2)
+        self.assertTrue(np.allclose(expected, actual))
+        blocked = bitset.jaccard(
+            bitset.pack_rows(self.queries), bitset.pack_rows(self.index), block_size=7
+        )
+        self.assertTrue(np.array_equal(actual, blocked))
+
+        empty = bitset.pack_rows(np.zeros((1, 70)))
+        self.assertEqual([[0.0]], bitset.jaccard(empty, empty).tolist())
+
+    def test_smallest(self):
+        r = np.random.RandomState(1)
+        # few distinct values, so the kth distance is tied in most rows
+        distances = r.randint(0, 4, size=(30, 20))
+        for k in [0, 1, 5, 19, 20]:
+            expected = np.argsort(distances, axis=1, kind="stable")[:, :k]
+            self.assertEqual(expected.tolist(), bitset.smallest(distances, k).tolist())
+
+    def test_bitset_knn(self):
+        for metric in bitset.KERNELS:
+            model = bitset.BitsetKNN(n_neighbors=4, metric=metric, batch_size=2)
+            distances, indices = model.fit(self.index).kneighbors(self.queries)
+            self.assertEqual((9, 4), indices.shape)
+
+            d = bitset.KERNELS[metric](
+                bitset.pack_rows(self.queries), bitset.pack_rows(self.index)
+            )
+            expected = np.argsort(d, axis=1, kind="stable")[:, :4]
+            self.assertEqual(expected.tolist(), indices.tolist())
+            self.assertTrue(
+                np.allclose(np.take_along_axis(d, expected, axis=1), distances)
+            )
+
+        # more neighbors than rows
+        _, indices = (
+            bitset.BitsetKNN(n_neighbors=80)
+            .fit(self.index)
+            .kneighbors(self.queries[:1])
+        )
+        self.assertEqual(list(range(50)), sorted(indices[0]))
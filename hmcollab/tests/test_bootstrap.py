@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from hmcollab import bootstrap, scoring
+
+
+class TestBootstrap(unittest.TestCase):
+    def setUp(self):
+        r = np.random.RandomState(42)
+        self.hits = r.rand(5000, 12) < 0.1
+        self.ap = scoring.ap_at_k_batch(self.hits)
+        self.continuous = r.rand(1000)
+
+    def tearDown(self):
+        pass
+
+    def test_resample_means(self):
+        means = bootstrap.resample_means(self.continuous, n_resamples=100)
+        self.assertEqual((100,), means.shape)
+        self.assertEqual(
+            list(means),
+            list(bootstrap.resample_means(self.continuous, 100, batch_size=7)),
+        )
+        self.assertNotEqual(
+            list(means), list(bootstrap.resample_means(self.continuous, 100, seed=1))
+        )
+
+        # the spread of the means is the standard error of the mean
+        for values in [self.ap, self.continuous]:
+            means = bootstrap.resample_means(values, n_resamples=2000)
+            se = values.std() / np.sqrt(len(values))
+            self.assertAlmostEqual(values.mean(), means.mean(), delta=se / 5)
+            self.assertAlmostEqual(1, means.std() / se, delta=0.1)
+
+    def test_bootstrap_ci(self):
+        mean, low, high = bootstrap.bootstrap_ci(self.ap)
+        self.assertEqual(scoring.map_at_k(self.hits.tolist()), mean)
+        self.assertLess(low, mean)
+        self.assertLess(mean, high)
+
+        _, low_90, high_90 = bootstrap.bootstrap_ci(self.ap, confidence=0.9)
+        self.assertLess(low, low_90)
+        self.assertLess(high_90, high)
+
+        self.assertTrue(np.isnan(bootstrap.bootstrap_ci([])[1]))
+
+    def test_jackknife_ci(self):
+        mean, low, high = bootstrap.jackknife_ci(self.continuous)
+        # for the mean, the jackknife standard error is the usual one
+        se = self.continuous.std(ddof=1) / np.sqrt(len(self.continuous))
+        self.assertAlmostEqual(1.959964 * se, high - mean, places=6)
+        self.assertAlmostEqual(mean - low, high - mean)
+
+        _, boot_low, boot_high = bootstrap.bootstrap_ci(self.continuous)
+        self.assertAlmostEqual(
+            high - low, boot_high - boot_low, delta=(high - low) / 10
+        )
+
+    def test_paired_difference_ci(self):
+        better = scoring.ap_at_k_batch(self.hits | (np.arange(12) == 0))
+        difference, low, high = bootstrap.paired_difference_ci(better, self.ap)
+        self.assertAlmostEqual(better.mean() - self.ap.mean(), difference)
+        self.assertGreater(low, 0)
+
+        difference, low, high = bootstrap.paired_difference_ci(self.ap, self.ap)
+        self.assertEqual((0, 0, 0), (difference, low, high))
+
+        with self.assertRaises(ValueError):
+            bootstrap.paired_difference_ci(self.ap, self.ap[1:])
@@ -0,0 +1,116 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import pandas as pd
+
+from hmcollab import csv_cache
+from hmcollab.directory_tree import HMDatasetDirectoryTree, read_with_article_id
+
+
+class TestCsvCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_directory = os.path.join(self.directory.name, "cache")
+        self.tree = HMDatasetDirectoryTree(
+            base=self.directory.name, cache_directory=self.cache_directory
+        )
+        pd.DataFrame(
+            {
+                "article_id": ["0108775015", "0108775044"],
+                "product_code": ["0108775", "0108775"],
+                "colour_group_code": ["09", "10"],
+                "department_no": [1676, 1676],
+            }
+        ).to_csv(self.tree.articles, index=False)
+        pd.DataFrame(
+            {
+                "t_dat": ["2020-09-20", "2020-09-21"],
+                "customer_id": ["00", "01"],
+                "article_id": ["0108775015", "0108775044"],
+                "price": [0.01, 0.02],
+                "sales_channel_id": [1, 2],
+            }
+        ).to_csv(self.tree.transactions, index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache_is_written_on_first_load(self):
+        filename = csv_cache.cache_filename(self.tree.articles, self.cache_directory)
+        self.assertFalse(os.path.exists(filename))
+        self.tree.load_articles()
+        self.assertTrue(os.path.exists(filename))
+        # nothing is written beside the csv files
+        self.assertEqual(
+            ["articles.csv", "cache", "transactions_train.csv"],
+            sorted(os.listdir(self.directory.name)),
+        )
+
+    def test_default_cache_directory(self):
+        filename = csv_cache.cache_filename(self.tree.articles)
+        self.assertEqual(csv_cache.cache_directory(), os.path.dirname(filename))
+        self.assertFalse(filename.startswith(self.directory.name))
+        # csv files with the same name in other directories do not collide
+        other = os.path.join(self.directory.name, "other", "articles.csv")
+        self.assertNotEqual(filename, csv_cache.cache_filename(other))
+
+    def test_articles_round_trip(self):
+        expected = self.tree.load_articles()
+        actual = self.tree.load_articles()
+        pd.testing.assert_frame_equal(expected, actual)
+        self.assertEqual("0108775015", actual.article_id[0])
+        self.assertEqual("0108775", actual.product_code[0])
+        self.assertEqual("09", actual.colour_group_code[0])
+        self.assertEqual(object, actual.article_id.dtype)
+
+    def test_transactions_round_trip(self):
+        expected = read_with_article_id(self.tree.transactions)
+        self.tree.load_transactions()
+        actual = self.tree.load_transactions()
+        pd.testing.assert_frame_equal(expected, actual)
+
+    def test_stale_cache_is_ignored(self):
+        self.tree.load_transactions()
+        df = read_with_article_id(self.tree.transactions)
+        df.iloc[:1].to_csv(self.tree.transactions, index=False)
+        self.assertIsNone(
+            csv_cache.read_cache(self.tree.transactions, self.cache_directory)
+        )
+
+        actual = self.tree.load_transactions()
+        self.assertEqual((1, 5), actual.shape)
+
+    def test_other_versions_cache_is_ignored(self):
+        self.tree.load_transactions()
+        filename = csv_cache.cache_filename(
+            self.tree.transactions, self.cache_directory
+        )
+        with open(filename, "wb") as f:
+            stamp = csv_cache.stamp(self.tree.transactions) + ("0.0", "0.0")
+            pickle.dump(stamp, f)
+            pickle.dump("frame", f)
+        self.assertIsNone(
+            csv_cache.read_cache(self.tree.transactions, self.cache_directory)
+        )
+
+        # a frame that other versions cannot unpickle
+        with open(filename, "wb") as f:
+            pickle.dump(csv_cache.cache_stamp(self.tree.transactions), f)
+            f.write(b"\x80\x04cno_such_module\nFrame\n.")
+        self.assertIsNone(
+            csv_cache.read_cache(self.tree.transactions, self.cache_directory)
+        )
+        pd.testing.assert_frame_equal(
+            read_with_article_id(self.tree.transactions),
+            self.tree.load_transactions(),
+        )
+
+    def test_cache_disabled(self):
+        tree = HMDatasetDirectoryTree(
+            base=self.directory.name, cache=False, cache_directory=self.cache_directory
+        )
+        tree.load_articles()
+        filename = csv_cache.cache_filename(tree.articles, self.cache_directory)
+        self.assertFalse(os.path.exists(filename))
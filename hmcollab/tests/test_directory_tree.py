@@ -1,15 +1,28 @@
+import tempfile
 import unittest
 
-from hmcollab import directories
-from hmcollab.directory_tree import HMDatasetDirectoryTree
+import pandas as pd
+
+from hmcollab import directories, splitter
+from hmcollab.directory_tree import HMDatasetDirectoryTree, read_with_article_id
+from hmcollab.tests import fake_data
 
 
 class TestDirectoryTree(unittest.TestCase):
     def setUp(self):
-        pass
+        self.directory = tempfile.TemporaryDirectory()
+        self.tree = HMDatasetDirectoryTree(base=self.directory.name, cache=False)
+        dataset = fake_data.random_dataset(
+            n_customers=20, n_articles=50, n_transactions=500
+        )
+        dataset.transactions.to_csv(
+            self.tree.transactions, index=False, date_format="%Y-%m-%d"
+        )
+        self.transactions = read_with_article_id(self.tree.transactions)
+        self.dataset = dataset
 
     def tearDown(self):
-        pass
+        self.directory.cleanup()
 
     def test_directory_tree(self):
         tree = HMDatasetDirectoryTree(base="base")
@@ -40,3 +53,64 @@ class TestDirectoryTree(unittest.TestCase):
         expected = directories.data()
         actual = HMDatasetDirectoryTree().path()
         self.assertEqual(expected, actual)
+
+    def test_load_transactions_slice_everything(self):
+        actual = self.tree.load_transactions_slice(chunksize=64)
+        pd.testing.assert_frame_equal(self.transactions, actual)
+
+    def test_load_transactions_slice_dates(self):
+        t = self.transactions
+        expected = t[(t.t_dat >= "2021-04-01") & (t.t_dat < "2022-03-15")]
+        actual = self.tree.load_transactions_slice(
+            start="2021-04-01", end=pd.Timestamp("2022-03-15"), chunksize=64
+        )
+        self.assertGreater(actual.shape[0], 0)
+        pd.testing.assert_frame_equal(expected, actual)
+
+    def test_load_transactions_slice_customers_and_columns(self):
+        t = self.transactions
+        customer_ids = {"02", "03", "0a"}
+        expected = t.loc[
+            (t.t_dat >= "2022-01-01") & t.customer_id.isin(customer_ids),
+            ["article_id", "price"],
+        ]
+        actual = self.tree.load_transactions_slice(
+            start="2022-01-01",
+            customer_ids=customer_ids,
+            columns=["article_id", "price"],
+            chunksize=64,
+        )
+        self.assertGreater(actual.shape[0], 0)
+        pd.testing.assert_frame_equal(expected, actual)
+
+    def save_articles_and_customers(self):
+        self.dataset.articles.to_csv(self.tree.articles, index=False)
+        self.dataset.customers.to_csv(self.tree.customers, index=False)
+
+    def test_load_parallel(self):
+        self.save_articles_and_customers()
+        expected = self.tree.load()
+        actual = self.tree.load(parallel=True)
+        self.assertEqual(4, len(actual))
+        for e, a in zip(expected[:3], actual[:3]):
+            pd.testing.assert_frame_equal(e, a)
+        self.assertIsNone(actual[3])
+
+    def test_lazy(self):
+        # there is no articles.csv, so only transactions can be loaded
+        lazy = self.tree.lazy()
+        pd.testing.assert_frame_equal(self.transactions, lazy.transactions)
+        self.assertIs(lazy.transactions, lazy.transactions)
+        self.assertIsNone(lazy.relevant_set)
+        with self.assertRaises(FileNotFoundError):
+            lazy.articles
+
+    def test_load_transactions_slice_customer_filter(self):
+        customer_hash = splitter.CustomerHash([0.5, 0.5])
+        t = self.transactions
+        expected = t[customer_hash.labels(t.customer_id) == 1]
+        actual = self.tree.load_transactions_slice(
+            customer_filter=lambda ids: customer_hash.labels(ids) == 1, chunksize=64
+        )
+        self.assertGreater(actual.shape[0], 0)
+        pd.testing.assert_frame_equal(expected, actual)
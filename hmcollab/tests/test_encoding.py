@@ -0,0 +1,116 @@
+import unittest
+
+import numpy as np
+
+from hmcollab.encoding import (
+    DatasetIds,
+    IdDictionary,
+    RelevantCodes,
+    is_encoded,
+    isin_sorted,
+    pair_keys,
+)
+from hmcollab.tests import fake_data
+
+
+class TestEncoding(unittest.TestCase):
+    def setUp(self):
+        self.fake_dataset = fake_data.random_dataset(
+            n_customers=100, n_articles=1000, n_transactions=10000
+        )
+        self.fake_dataset.prune()
+
+    def tearDown(self):
+        pass
+
+    def test_id_dictionary(self):
+        d = IdDictionary(["0b", "0a", "0c", "0a"])
+        self.assertEqual(3, len(d))
+
+        expected = [1, 0, 2, -1]
+        actual = d.encode(["0b", "0a", "0c", "not an id"])
+        self.assertEqual(expected, list(actual))
+        self.assertEqual(np.int32, actual.dtype)
+
+        expected = ["0c", "0a"]
+        actual = list(d.decode([2, 0]))
+        self.assertEqual(expected, actual)
+
+        self.assertEqual(0, len(d.decode([])))
+
+        # a dictionary of utf-8 bytes encodes and decodes the same
+        words = IdDictionary.from_bytes(d.to_bytes())
+        self.assertEqual("S", d.to_bytes().dtype.kind)
+        self.assertEqual(3, len(words))
+        queries = ["0b", "0a", "0c", "not an id", "0", "0cc", "1"]
+        self.assertEqual(list(d.encode(queries)), list(words.encode(queries)))
+        self.assertEqual(list(d.decode([2, -1, 0])), list(words.decode([2, -1, 0])))
+        self.assertEqual(list(d.ids), list(words.ids))
+        empty = IdDictionary.from_bytes(IdDictionary([]).to_bytes())
+        self.assertEqual([-1], list(empty.encode(["0a"])))
+
+        # unknown ids round trip to None, not to the last id
+        self.assertEqual([None, "0a"], list(d.decode(d.encode(["not an id", "0a"]))))
+
+    def test_is_encoded(self):
+        self.assertTrue(is_encoded(np.array([1, 2], dtype=np.int32)))
+        self.assertFalse(is_encoded(["01", "02"]))
+
+    def test_encode_dataset(self):
+        encoded = self.fake_dataset.encode()
+        self.assertTrue(encoded.encoded)
+        self.assertFalse(self.fake_dataset.encoded)
+
+        self.assertEqual(np.int32, encoded.transactions.customer_id.dtype)
+        self.assertEqual(np.int32, encoded.transactions.article_id.dtype)
+        self.assertEqual(np.int32, encoded.customers.customer_id.dtype)
+        self.assertEqual(np.int32, encoded.articles.article_id.dtype)
+        self.assertEqual(
+            list(self.fake_dataset.transactions.columns),
+            list(encoded.transactions.columns),
+        )
+
+    def test_decode_dataset(self):
+        decoded = self.fake_dataset.encode().decode()
+        self.assertFalse(decoded.encoded)
+        self.assertTrue(self.fake_dataset.transactions.equals(decoded.transactions))
+        self.assertTrue(self.fake_dataset.customers.equals(decoded.customers))
+        self.assertTrue(self.fake_dataset.articles.equals(decoded.articles))
+
+    def test_customer_keys(self):
+        encoded = self.fake_dataset.encode()
+        customer_ids = ["02", "03"]
+        keys = encoded.customer_keys(customer_ids)
+        self.assertEqual(customer_ids, list(encoded.customer_labels(keys)))
+        self.assertIs(keys, encoded.customer_keys(keys))
+        self.assertIs(customer_ids, self.fake_dataset.customer_keys(customer_ids))
+
+        keys = encoded.customer_keys(["not a customer", "02"])
+        self.assertEqual([None, "02"], list(encoded.customer_labels(keys)))
+
+    def test_relevant_codes(self):
+        ids = DatasetIds(IdDictionary(["1a", "02"]), IdDictionary(["01", "02", "03"]))
+        relevant = RelevantCodes.from_codes([1, 0, 1, 0], [2, 1, 0, 0], ids)
+        self.assertEqual(2, len(relevant))
+        self.assertEqual([0, 1], list(relevant.customers))
+        self.assertEqual([0, 2, 4], list(relevant.offsets))
+        self.assertEqual([2, 2], list(relevant.lengths))
+        self.assertEqual([1, 0], list(relevant.articles(0)))
+        self.assertEqual([2, 0], list(relevant.articles(1)))
+
+        frame = relevant.to_frame()
+        self.assertEqual(["02", "1a"], list(frame.customer_id))
+        self.assertEqual(["02 01", "03 01"], list(frame.target))
+
+        # keys are sorted, distinct and built once
+        relevant = RelevantCodes.from_codes([1, 0, 1, 1], [2, 1, -1, 2], ids)
+        expected = [pair_keys(0, 1), pair_keys(1, 2)]
+        self.assertEqual(expected, list(relevant.keys()))
+        self.assertIs(relevant.keys(), relevant.keys())
+
+    def test_isin_sorted(self):
+        sorted_values = np.array([2, 5, 9])
+        values = np.array([[9, 1], [5, 10]])
+        expected = np.isin(values, sorted_values).tolist()
+        self.assertEqual(expected, isin_sorted(values, sorted_values).tolist())
+        self.assertEqual([False], list(isin_sorted([1], np.array([], dtype=int))))
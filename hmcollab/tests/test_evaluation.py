@@ -0,0 +1,100 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from hmcollab import datasets, models, scoring
+from hmcollab.evaluation import StreamingEvaluator
+from hmcollab.tests import fake_data
+
+
+class TestEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.target = pd.DataFrame(
+            {"customer_id": ["0", "1", "2"], "target": ["a b c d", "a b c", "a a"]}
+        )
+        self.prediction = pd.DataFrame(
+            {
+                "customer_id": ["0", "1", "2", "3"],
+                "prediction": ["a b c d", "c b e a", "e f g h", "a b"],
+            }
+        )
+
+    def tearDown(self):
+        pass
+
+    def test_metrics(self):
+        evaluator = StreamingEvaluator(self.target)
+        actual = evaluator.evaluate([self.prediction])
+        self.assertEqual(StreamingEvaluator.METRICS, list(actual))
+        # customer 3 has no target
+        self.assertEqual(3, evaluator.count)
+
+        expected = scoring.map_at_k(scoring.relevant(self.prediction, self.target))
+        self.assertAlmostEqual(expected, actual["map_at_k"])
+        self.assertAlmostEqual((1 + 3 / 4 + 0) / 3, actual["precision_at_k"])
+        self.assertAlmostEqual((1 + 1 + 0) / 3, actual["recall_at_k"])
+        self.assertAlmostEqual(2 / 3, actual["hit_rate"])
+
+        discounts = 1 / np.log2(np.arange(4) + 2)
+        ndcg_1 = (discounts[[0, 1, 3]]).sum() / discounts[:3].sum()
+        self.assertAlmostEqual((1 + ndcg_1 + 0) / 3, actual["ndcg_at_k"])
+
+    def test_k(self):
+        actual = StreamingEvaluator(self.target, k=2).evaluate([self.prediction])
+        self.assertAlmostEqual((1 + 1 + 0) / 3, actual["precision_at_k"])
+        self.assertAlmostEqual((1 / 2 + 2 / 3 + 0) / 3, actual["recall_at_k"])
+
+    def test_chunks(self):
+        dataset, target, prediction, ids = fake_data.random_evaluation()
+        expected = StreamingEvaluator(target, ids=ids).evaluate([prediction])
+        chunks = [prediction.iloc[i : i + 7] for i in range(0, 100, 7)]
+        evaluator = StreamingEvaluator(target)
+        keys = evaluator.target.keys()
+        actual = evaluator.evaluate(chunks)
+        # every chunk is matched against the keys built by the constructor
+        self.assertIs(keys, evaluator.target.keys())
+        for name in StreamingEvaluator.METRICS:
+            self.assertAlmostEqual(expected[name], actual[name])
+        self.assertAlmostEqual(
+            scoring.map_at_k(scoring.relevant(prediction, target)), actual["map_at_k"]
+        )
+
+    def test_duplicate_predictions(self):
+        target = pd.DataFrame({"customer_id": ["0", "1"], "target": ["a", "a b"]})
+        prediction = pd.DataFrame(
+            {"customer_id": ["0", "1"], "prediction": ["a a", "b b a"]}
+        )
+        actual = StreamingEvaluator(target).evaluate([prediction])
+        # a repeated hit gains once, at its first position
+        discounts = 1 / np.log2(np.arange(3) + 2)
+        ndcg_1 = discounts[[0, 2]].sum() / discounts[:2].sum()
+        self.assertAlmostEqual((1 + ndcg_1) / 2, actual["ndcg_at_k"])
+        self.assertLessEqual(actual["ndcg_at_k"], 1)
+        self.assertAlmostEqual(1, actual["recall_at_k"])
+        self.assertAlmostEqual(
+            scoring.map_at_k(scoring.relevant(prediction, target)), actual["map_at_k"]
+        )
+
+    def test_empty(self):
+        evaluator = StreamingEvaluator(self.target)
+        evaluator.update(self.prediction.iloc[:0])
+        self.assertEqual(0, evaluator.count)
+        self.assertTrue(np.isnan(evaluator.result()["map_at_k"]))
+
+    def test_recommend_batches(self):
+        dataset = fake_data.random_dataset(
+            n_customers=10, n_articles=10, n_transactions=100
+        )
+        dataset = datasets.HMDatasetTwoSets(threepartdataset=dataset)
+        recommender = models.PopularRecommender(dataset, total_recommendations=2)
+        customer_list = list(dataset.customers.customer_id)
+        batches = list(models.recommend_batches(recommender, customer_list, 3))
+        self.assertEqual([3, 3, 3, 1], [b.shape[0] for b in batches])
+        expected = recommender.recommend_all(customer_list)
+        self.assertTrue(expected.equals(pd.concat(batches, ignore_index=True)))
+
+        evaluator = StreamingEvaluator(dataset.relevant_set)
+        actual = evaluator.evaluate(batches)
+        expected = scoring.map_at_k(scoring.relevant(expected, dataset.relevant_set))
+        self.assertAlmostEqual(expected, actual["map_at_k"])
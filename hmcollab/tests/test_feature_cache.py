@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+from hmcollab import articles
+from hmcollab.feature_cache import FeatureCache, fingerprint
+from hmcollab.tests.fake_data import articles_random_df
+
+
+class CountingMunger(articles.ArticleFeatureMungerSpecificFeatures):
+    encoded = 0
+
+    def _to_array(self):
+        CountingMunger.encoded += 1
+        return super()._to_array()
+
+
+class TestFeatureCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.articles = articles_random_df(30)
+        CountingMunger.encoded = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def munger(self, cache, features, **kwargs):
+        return CountingMunger(
+            self.articles, features, use_article_id=True, cache=cache, **kwargs
+        )
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint(self.articles), fingerprint(self.articles.copy()))
+        changed = self.articles.copy()
+        changed.loc[0, "color"] = "not a color"
+        self.assertNotEqual(fingerprint(self.articles), fingerprint(changed))
+        renamed = self.articles.rename(columns={"color": "colour"})
+        self.assertNotEqual(fingerprint(self.articles), fingerprint(renamed))
+
+    def test_memory(self):
+        cache = FeatureCache(max_entries=1)
+        x = self.munger(cache, ["color"]).x
+        self.assertIs(x, self.munger(cache, ["color"]).x)
+        self.assertEqual(1, CountingMunger.encoded)
+        expected = articles.ArticleFeatureMungerSpecificFeatures(
+            self.articles, ["color"], use_article_id=True
+        ).x
+        self.assertTrue(expected.equals(x))
+
+        # settings are part of the key
+        self.munger(cache, ["color"], sparse=True)
+        self.assertEqual(2, CountingMunger.encoded)
+
+        # the least recently used entry was evicted
+        self.munger(cache, ["color"])
+        self.assertEqual(3, CountingMunger.encoded)
+
+    def test_disk(self):
+        cache = FeatureCache(self.directory.name, max_disk_entries=2)
+        x = self.munger(cache, ["color"]).x
+        other_cache = FeatureCache(self.directory.name, max_disk_entries=2)
+        self.assertTrue(x.equals(self.munger(other_cache, ["color"]).x))
+        self.assertEqual(1, CountingMunger.encoded)
+
+        self.munger(cache, ["article"])
+        self.munger(cache, ["color", "article"])
+        self.assertEqual(3, CountingMunger.encoded)
+        self.assertEqual(2, len(os.listdir(self.directory.name)))
+
+        # ["color"] was the least recently used on disk
+        self.munger(FeatureCache(self.directory.name), ["color"])
+        self.assertEqual(4, CountingMunger.encoded)
+        self.munger(FeatureCache(self.directory.name), ["color", "article"])
+        self.assertEqual(4, CountingMunger.encoded)
+
+    def test_unwritable_directory(self):
+        filename = os.path.join(self.directory.name, "file")
+        open(filename, "w").close()
+        cache = FeatureCache(os.path.join(filename, "cache"))
+        x = self.munger(cache, ["color"], sparse=True).x
+        self.assertEqual((30, self.articles.color.nunique()), x.shape)
+
+    def test_unreadable_file(self):
+        cache = FeatureCache(self.directory.name)
+        munger = self.munger(cache, ["color"])
+        x = munger.x
+        key = cache.key(munger)
+        # a matrix pickled by other versions of the libraries
+        with open(cache.filename(key), "wb") as f:
+            f.write(b"\x80\x04cno_such_module\nFrame\n.")
+        self.assertIsNone(cache.read(key))
+
+        other_cache = FeatureCache(self.directory.name)
+        self.assertTrue(x.equals(self.munger(other_cache, ["color"]).x))
+        self.assertEqual(2, CountingMunger.encoded)
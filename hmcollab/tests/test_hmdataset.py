@@ -72,6 +72,24 @@ class TestHMDataset(unittest.TestCase):
         self.assertEqual(list(target.relevant_set.target), list(relevant.target))
         # TODO: Really? It seems that target.relevant_set is the same as relevant.
 
+    def test_target_to_relevant_as_codes(self):
+        target = datasets.Target(self.fake_dataset.transactions, 20)
+        expected = datasets.target_to_relevant(target.transactions_y)
+
+        codes = datasets.target_to_relevant(target.transactions_y, as_codes=True)
+        self.assertEqual(expected.shape[0], len(codes))
+        self.assertEqual(target.transactions_y.shape[0], codes.offsets[-1])
+        self.assertTrue(expected.equals(codes.to_frame()))
+
+        encoded = self.fake_dataset.encode()
+        target = datasets.Target(encoded.transactions, 20, ids=encoded.ids)
+        self.assertTrue(expected.equals(target.relevant_set))
+        codes = datasets.target_to_relevant(
+            target.transactions_y, ids=encoded.ids, as_codes=True
+        )
+        self.assertIs(encoded.ids, codes.ids)
+        self.assertTrue(expected.equals(codes.to_frame()))
+
     def test_hmdataset_twosets(self):
         dataset = datasets.HMDatasetTwoSets(threepartdataset=self.fake_dataset)
 
@@ -140,6 +158,20 @@ class TestHMDataset(unittest.TestCase):
         actual = dataset.test_y.iloc[0].to_dict()
         self.assertEqual(expected, actual)
 
+    def test_hmdataset_twosets_encoded(self):
+        expected = datasets.HMDatasetTwoSets(threepartdataset=self.fake_dataset)
+        actual = datasets.HMDatasetTwoSets(threepartdataset=self.fake_dataset.encode())
+
+        self.assertTrue(actual.encoded)
+        self.assertTrue(expected.relevant_set.equals(actual.relevant_set))
+        for e, a in [
+            (expected.train_x, actual.train_x),
+            (expected.train_y, actual.train_y),
+            (expected.test_x, actual.test_x),
+            (expected.test_y, actual.test_y),
+        ]:
+            self.assertTrue(e.equals(actual.ids.decode_frame(a)))
+
     def test_hmdataset_threesets(self):
         dataset = datasets.HMDatasetThreeSets(threepartdataset=self.fake_dataset)
 
@@ -289,3 +321,85 @@ class TestHMDataset(unittest.TestCase):
 
         actual = dataset.train_y.iloc[0].to_dict()
         self.assertEqual(expected, actual)
+
+    def test_hmdataset_folds_are_views(self):
+        dataset = datasets.HMDatasetThreeSets(threepartdataset=self.fake_dataset)
+        view = dataset.views["train_x"]
+        self.assertIs(dataset.transactions, view.base)
+        self.assertEqual(dataset.train_x.shape[0], len(view))
+        self.assertTrue(
+            dataset.transactions.iloc[view.positions].equals(dataset.train_x)
+        )
+        with self.assertRaises(AttributeError):
+            dataset.train_vy
+
+        # each fold is copied out of the transactions once
+        self.assertIs(dataset.train_x, dataset.train_x)
+
+    def test_memory_report(self):
+        dataset = datasets.HMDatasetTwoSets(threepartdataset=self.fake_dataset)
+        report = dataset.memory_report()
+        self.assertNotIn("train_x", report)
+        self.assertEqual(0, report["relevant_set"])
+
+        report = dataset.materialize().memory_report()
+
+        expected = 4 * dataset.train_x.shape[0]
+        actual = report["train_x"]
+        self.assertEqual(expected, actual)
+
+        expected = dataset.transactions.memory_usage(deep=True).sum()
+        actual = report["transactions"]
+        self.assertEqual(expected, actual)
+
+        total = report.pop("total")
+        self.assertEqual(sum(report.values()), total)
+        for name in ["train_x", "train_y", "test_x", "test_y"]:
+            self.assertLess(report[name], report["transactions"])
+
+        # the relevant set materialized transactions_y, and train_x was accessed since
+        expected = sum(
+            dataset.__dict__[name].memory_usage(deep=True).sum()
+            for name in ["transactions_y", "train_x"]
+        )
+        self.assertEqual(expected, dataset.memory_report()["frames"])
+
+    def test_hmdataset_lazy_folds(self):
+        dataset = datasets.HMDatasetThreeSets(threepartdataset=self.fake_dataset)
+        self.assertEqual({}, dict(dataset.views))
+        self.assertNotIn("relevant_set", dataset.__dict__)
+
+        # folds do not depend on the order in which they are first used
+        expected = datasets.HMDatasetThreeSets(
+            threepartdataset=self.fake_dataset
+        ).materialize()
+        self.assertTrue(expected.val_y.equals(dataset.val_y))
+        self.assertEqual(
+            {"transactions_x", "transactions_y", "val_y"}, set(dataset.views)
+        )
+        self.assertTrue(expected.train_x.equals(dataset.train_x))
+        self.assertTrue(expected.test_x.equals(dataset.test_x))
+        self.assertNotIn("relevant_set", dataset.__dict__)
+
+        self.assertTrue(expected.relevant_set.equals(dataset.relevant_set))
+
+    def test_target_is_lazy(self):
+        target = datasets.Target(self.fake_dataset.transactions, 20)
+        self.assertNotIn("relevant_set", target.__dict__)
+        self.assertEqual((1828, 5), target.transactions_y.shape)
+        self.assertNotIn("relevant_set", target.__dict__)
+        self.assertEqual((100, 2), target.relevant_set.shape)
+
+    def test_hmdataset_hashsets(self):
+        dataset = datasets.HMDatasetHashSets(threepartdataset=self.fake_dataset)
+        train = set(dataset.train_x.customer_id)
+        val = set(dataset.val_x.customer_id)
+        test = set(dataset.test_x.customer_id)
+        self.assertEqual(set(), train.intersection(val))
+        self.assertEqual(set(), train.intersection(test))
+        self.assertEqual(set(), val.intersection(test))
+        self.assertEqual(
+            dataset.transactions_x.shape[0],
+            dataset.train_x.shape[0] + dataset.val_x.shape[0] + dataset.test_x.shape[0],
+        )
+        self.assertEqual(set(), set(dataset.train_y.customer_id).intersection(test))
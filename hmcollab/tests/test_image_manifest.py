@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from hmcollab import directories
+from hmcollab.directory_tree import HMDatasetDirectoryTree
+from hmcollab.image_manifest import ImageManifest
+
+
+class TestImageManifest(unittest.TestCase):
+    def setUp(self):
+        self.manifest = ImageManifest.build(directories.testdata("images"))
+        self.article_ids = ["1234567890", "0108775015", "5678901234"]
+
+    def tearDown(self):
+        pass
+
+    def test_build(self):
+        self.assertEqual(2, len(self.manifest))
+        expected = {"1234567890", "5678901234"}
+        actual = set(self.manifest.article_ids)
+        self.assertEqual(expected, actual)
+
+    def test_has_image(self):
+        expected = [True, False, True]
+        actual = list(self.manifest.has_image(self.article_ids))
+        self.assertEqual(expected, actual)
+
+    def test_image_size(self):
+        tree = HMDatasetDirectoryTree(base=directories.testdata())
+        expected = [
+            os.path.getsize(tree.image("1234567890")),
+            -1,
+            os.path.getsize(tree.image("5678901234")),
+        ]
+        actual = list(self.manifest.image_size(self.article_ids))
+        self.assertEqual(expected, actual)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "image_manifest.npz")
+            self.manifest.save(filename)
+            manifest = ImageManifest.load(filename)
+        self.assertEqual(list(self.manifest.article_ids), list(manifest.article_ids))
+        self.assertEqual(list(self.manifest.sizes), list(manifest.sizes))
+        self.assertEqual(
+            list(self.manifest.has_image(self.article_ids)),
+            list(manifest.has_image(self.article_ids)),
+        )
@@ -1,6 +1,7 @@
 import unittest
 
 import numpy as np
+from scipy import sparse
 
 from hmcollab import datasets, articles, models
 from hmcollab.tests import fake_data
@@ -155,3 +156,148 @@ class TestKNNRecommenders(unittest.TestCase):
         actual = recommender.model.nearest(np.array([0, 0, 0, 0, 0]))[1]
         actual = list(actual.reshape(-1))
         self.assertEqual(expected, actual)
+
+    def test_knn_recommender_sparse(self):
+        sparse_dummies = articles.ArticleFeatureMungerSpecificFeatures(
+            self.dataset.articles, ["color", "article"], sparse=True
+        ).x
+        recommender = models.KnnRecommender(
+            self.dataset,
+            sparse_dummies,
+            groups=2,
+            total_recommendations=6,
+            threshold=6,
+            warning=False,
+        )
+        self.assertEqual(5, recommender.filtered_dummies.article_id.nunique())
+
+        expected = models.KnnRecommender(
+            self.dataset,
+            self.full_dummies,
+            groups=2,
+            total_recommendations=6,
+            threshold=6,
+            warning=False,
+        )
+        row = np.array([0, 0, 0, 0, 0])
+        expected_distances, _ = expected.model.nearest(row)
+        actual_distances, _ = recommender.model.nearest(row)
+        self.assertTrue(np.allclose(expected_distances, actual_distances))
+
+        recommendations = recommender.recommend(self.customer)
+        self.assertEqual(6, len(recommendations))
+        self.assertTrue(
+            set(recommendations) <= set(recommender.filtered_dummies.article_id)
+        )
+
+    def test_knn_recommender_bitset(self):
+        for metric in ["hamming", "jaccard"]:
+            recommender = models.KnnRecommender(
+                self.dataset,
+                self.full_dummies,
+                groups=2,
+                total_recommendations=6,
+                threshold=6,
+                warning=False,
+                metric=metric,
+            )
+            self.assertEqual(3, recommender.model.k)
+            recommendations = recommender.recommend(self.customer)
+            self.assertEqual(6, len(recommendations))
+
+        # on 0/1 dummies the hamming distance is the squared euclidean distance
+        expected = models.KnnRecommender(
+            self.dataset,
+            self.full_dummies,
+            groups=2,
+            total_recommendations=6,
+            threshold=6,
+            warning=False,
+        )
+        recommender = models.KnnRecommender(
+            self.dataset,
+            self.full_dummies,
+            groups=2,
+            total_recommendations=6,
+            threshold=6,
+            warning=False,
+            metric="hamming",
+        )
+        row = np.array([0, 0, 0, 0, 0])
+        expected_distances, _ = expected.model.nearest(row)
+        actual_distances, _ = recommender.model.nearest(row)
+        self.assertTrue(np.allclose(expected_distances**2, actual_distances))
+
+    def test_pattern_index(self):
+        values = np.array([[1, 0], [0, 1], [1, 0], [1, 0], [0, 1]])
+        index = models.PatternIndex(values, popularity=[1, 5, 3, 1, 0])
+        self.assertEqual(2, len(index))
+        self.assertEqual([[1, 0], [0, 1]], index.values.tolist())
+        # members of each pattern, most popular first, ties by row
+        self.assertEqual([2, 0, 3, 1, 4], list(index.members))
+
+        distances, indices = index.expand(np.array([[0.0, 2.0]]), np.array([[1, 0]]), 4)
+        self.assertEqual([[1, 4, 2, 0]], indices.tolist())
+        self.assertEqual([[0.0, 0.0, 2.0, 2.0]], distances.tolist())
+
+        # same patterns from a sparse matrix
+        codes, first = models.feature_patterns(values)
+        self.assertEqual([0, 1, 0, 0, 1], list(codes))
+        self.assertEqual([0, 1], list(first))
+        codes, first = models.feature_patterns(sparse.csr_matrix(values))
+        self.assertEqual([0, 1, 0, 0, 1], list(codes))
+        self.assertEqual([0, 1], list(first))
+
+        # values other than 0/1 are compared as they are, not bit-packed
+        codes, first = models.feature_patterns(values * np.array([[0.5, 2]]))
+        self.assertEqual([0, 1, 0, 0, 1], list(codes))
+        codes, _ = models.feature_patterns(np.array([[0.4, 0], [0.2, 0]]))
+        self.assertEqual([0, 1], list(codes))
+        codes, _ = models.feature_patterns(sparse.csr_matrix([[0.4, 0], [0.2, 0]]))
+        self.assertEqual([0, 1], list(codes))
+
+    def test_knn_recommender_dedupe(self):
+        sparse_dummies = articles.ArticleFeatureMungerSpecificFeatures(
+            self.dataset.articles, ["color", "article"], sparse=True
+        ).x
+        for metric in ["euclidean", "hamming", "jaccard"]:
+            expected = models.KnnRecommender(
+                self.dataset,
+                self.full_dummies,
+                groups=2,
+                total_recommendations=6,
+                threshold=6,
+                warning=False,
+                metric=metric,
+            )
+            rows = [
+                np.array([0, 0, 0, 0, 0]),
+                expected.filtered_dummies.drop(columns=["article_id"]).values[0],
+            ]
+            for dummies in [self.full_dummies, sparse_dummies]:
+                recommender = models.KnnRecommender(
+                    self.dataset,
+                    dummies,
+                    groups=2,
+                    total_recommendations=6,
+                    threshold=6,
+                    warning=False,
+                    metric=metric,
+                    dedupe=True,
+                )
+                patterns = recommender.model.patterns
+                self.assertLessEqual(
+                    len(patterns), recommender.filtered_dummies.shape[0]
+                )
+
+                for row in rows:
+                    expected_distances, _ = expected.model.nearest(row)
+                    actual_distances, indices = recommender.model.nearest(row)
+                    self.assertEqual((1, 3), indices.shape)
+                    self.assertTrue(np.allclose(expected_distances, actual_distances))
+
+                recommendations = recommender.recommend(self.customer)
+                self.assertEqual(6, len(recommendations))
+                self.assertTrue(
+                    set(recommendations) <= set(recommender.filtered_dummies.article_id)
+                )
@@ -58,3 +58,18 @@ class TestPopularRecommender(unittest.TestCase):
         actual = actual_recommend_all.iloc[0, 1]
         expected = " ".join(actual_recommend)
         self.assertEqual(expected, actual)
+
+    def test_popular_recommender_encoded(self):
+        dataset = fake_data.random_dataset(
+            n_customers=3, n_articles=10, n_transactions=100
+        )
+        dataset = datasets.HMDatasetTwoSets(threepartdataset=dataset.encode())
+        recommender = models.PopularRecommender(dataset, total_recommendations=2)
+
+        customer_list = dataset.customer_keys(self.customer_list)
+        actual = recommender.recommend_all(customer_list)
+        expected = models.PopularRecommender(
+            self.dataset, total_recommendations=2
+        ).recommend_all(self.customer_list)
+        self.assertEqual(list(expected.customer_id), list(actual.customer_id))
+        self.assertEqual(list(expected.prediction), list(actual.prediction))
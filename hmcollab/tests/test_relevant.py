@@ -1,7 +1,7 @@
 import unittest
 import pandas as pd
 
-from scripts.generate_data_subsets import generate_relevant
+from scripts.generate_data_subsets import generate_relevant, generate_relevant_windows
 
 class TestRelevant(unittest.TestCase):
     def test_random_relevant(self):
@@ -19,3 +19,29 @@ class TestRelevant(unittest.TestCase):
         self.assertEqual(1, mini_relevant_val.shape[0])  
         actual = mini_relevant_val.target[mini_relevant_val.customer_id == "02"].to_list()
         self.assertEqual(['05'], actual)     
+
+    def test_relevant_windows(self):
+        transactions_mini = pd.DataFrame({'t_dat': ["2023-09-09", "2023-08-10", "2023-08-15", "2023-09-08", "2023-09-01"],
+              'customer_id': ["1a", "1a", "02", "1a", "02"], 'article_id': ["01", "02", "03", "04", "05"],
+              'price': [0.015, 0.017, 0.07, 0.03, 0.01], 'sales_channel_id': [1, 1, 2, 2, 1]})
+        windows = [(0, 7), (7, 7), (0, 28), (0, 60)]
+        relevant_sets = generate_relevant_windows(transactions_mini.copy(), windows)
+
+        self.assertEqual(windows, list(relevant_sets))
+        self.assertTrue(generate_relevant(transactions_mini.copy(), days=7).equals(relevant_sets[(0, 7)]))
+        self.assertTrue(generate_relevant(transactions_mini.copy(), days=7, val=True).equals(relevant_sets[(7, 7)]))
+        self.assertEqual(['03 05', '01 04'], relevant_sets[(0, 28)].target.to_list())
+        self.assertEqual(['03 05', '01 02 04'], relevant_sets[(0, 60)].target.to_list())
+
+    def test_relevant_val_after_gap(self):
+        # no transactions in the week before the test window
+        transactions_mini = pd.DataFrame({'t_dat': ["2023-09-09", "2023-08-20", "2023-08-15", "2023-09-08", "2023-08-01"],
+              'customer_id': ["1a", "1a", "02", "1a", "02"], 'article_id': ["01", "02", "03", "04", "05"],
+              'price': [0.015, 0.017, 0.07, 0.03, 0.01], 'sales_channel_id': [1, 1, 2, 2, 1]})
+        relevant_sets = generate_relevant_windows(transactions_mini.copy(), [(7, 7), (14, 7)])
+        self.assertEqual(0, relevant_sets[(7, 7)].shape[0])
+        self.assertEqual(['02'], relevant_sets[(14, 7)].target.to_list())
+
+        # the validation set splits the older part again, from its last transaction
+        mini_relevant_val = generate_relevant(transactions_mini.copy(), days=7, val=True)
+        self.assertEqual(['03', '02'], mini_relevant_val.target.to_list())
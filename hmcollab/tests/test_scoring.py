@@ -1,8 +1,22 @@
 import unittest
 
+import numpy as np
 import pandas as pd
 
-from hmcollab.scoring import precision_at_k, ap_at_k, map_at_k, relevant
+from hmcollab.encoding import DatasetIds, IdDictionary, RelevantCodes
+from hmcollab.similarity import ArticleSimilarityByColumn, get_similarity
+from hmcollab.scoring import (
+    SimilarityEvaluator,
+    precision_at_k,
+    ap_at_k,
+    ap_at_k_batch,
+    hit_matrix,
+    map_at_k,
+    relevant,
+    relevant_codes,
+    relevant_hits,
+)
+from hmcollab.tests import fake_data
 
 
 class TestScoring(unittest.TestCase):
@@ -141,3 +155,92 @@ class TestScoring(unittest.TestCase):
         expected = [False, False, False, False]
         actual = list(r[2])
         self.assertEqual(expected, actual)
+
+    def test_hit_matrix(self):
+        hits, lengths = hit_matrix([[True, False], [], [False, False, True]])
+        expected = [[True, False, False], [False] * 3, [False, False, True]]
+        self.assertEqual(expected, hits.tolist())
+        self.assertEqual([2, 0, 3], list(lengths))
+
+    def test_ap_at_k_batch(self):
+        results = [
+            self.ranked_results,
+            self.perfect_results,
+            self.total_failure_results,
+            [],
+            [0, 1, 1],
+            [True],
+        ]
+        expected = [ap_at_k(r) for r in results]
+        actual = ap_at_k_batch(*hit_matrix(results))
+        self.assertEqual(expected, list(actual))
+
+        hits = np.array([self.ranked_results, self.perfect_results])
+        expected = [ap_at_k(self.ranked_results), 1]
+        self.assertEqual(expected, list(ap_at_k_batch(hits)))
+
+    def test_map_at_k_of_relevant(self):
+        target = pd.DataFrame({"customer_id": ["0", "1"], "target": ["a b", "c"]})
+        prediction = pd.DataFrame(
+            {"customer_id": ["0", "1"], "prediction": ["b x a", "x c"]}
+        )
+        r = relevant(prediction, target)
+        expected = (ap_at_k([True, False, True]) + ap_at_k([False, True])) / 2
+        self.assertEqual(expected, map_at_k(r))
+
+    def test_relevant_hits(self):
+        customer_id = "0 1 2 3".split(" ")
+        target = pd.DataFrame(
+            {"customer_id": customer_id[:3], "target": ["a b c d", "a b c", "a b"]}
+        )
+        prediction = pd.DataFrame(
+            {
+                "customer_id": customer_id,
+                "prediction": ["a b c d", "c b e a", "e f g h", "a b"],
+            }
+        )
+        ids = DatasetIds(IdDictionary(customer_id), IdDictionary(list("abcdefgh")))
+        hits, lengths = relevant_hits(prediction, target, ids)
+
+        expected = hit_matrix(relevant(prediction, target))
+        self.assertEqual(expected[0].tolist(), hits.tolist())
+        self.assertEqual(list(expected[1]), list(lengths))
+
+    def test_relevant_codes(self):
+        ids = DatasetIds(IdDictionary(["0", "1"]), IdDictionary(["a", "b", "c"]))
+        target = RelevantCodes.from_codes([0, 0, 1], [0, 2, 1], ids)
+        customers = [1, 0, 2]
+        articles = [[1, 0], [2, -1], [0, 1]]
+        hits, lengths = relevant_codes(customers, articles, target)
+        self.assertEqual([[True, False], [True, False]], hits.tolist())
+        self.assertEqual([2, 1], list(lengths))
+
+    def test_relevant_hits_random(self):
+        dataset, target, prediction, ids = fake_data.random_evaluation()
+        expected = relevant(prediction, target)
+        hits, lengths = relevant_hits(prediction, target, ids)
+        self.assertGreater(hits.sum(), 0)
+        self.assertEqual(map_at_k(expected), np.mean(ap_at_k_batch(hits, lengths)))
+        expected_hits, expected_lengths = hit_matrix(expected)
+        k = expected_hits.shape[1]
+        self.assertEqual(expected_hits.tolist(), hits[:, :k].tolist())
+        self.assertEqual(list(expected_lengths), list(lengths))
+
+    def test_similarity_evaluator(self):
+        dataset, target, prediction, _ = fake_data.random_evaluation()
+        similarities = {
+            "identical": get_similarity("identical", dataset.articles),
+            "color": ArticleSimilarityByColumn(dataset.articles, "color"),
+            "article": ArticleSimilarityByColumn(dataset.articles, "article"),
+        }
+        actual = SimilarityEvaluator(similarities).map_at_k(prediction, target)
+        self.assertEqual(list(similarities), list(actual))
+        for name, similarity in similarities.items():
+            expected = map_at_k(relevant(prediction, target, similarity))
+            self.assertEqual(expected, actual[name])
+        self.assertLess(actual["identical"], actual["color"])
+
+        evaluator = SimilarityEvaluator(["identical", "department_no"], None)
+        self.assertEqual(
+            "department_no", evaluator.similarities["department_no"].column_name
+        )
@@ -1,7 +1,10 @@
 import unittest
 
+import numpy as np
+
 from hmcollab.similarity import (
     IdenticalSimilarity,
+    Similarity,
     ArticleSimilarityByColumn,
     get_similarity,
 )
@@ -188,3 +191,25 @@ class TestSimilarity(unittest.TestCase):
 
         sim = get_similarity("not a similarity", None)
         self.assertIsInstance(sim, IdenticalSimilarity)
+
+    def test_attribute_codes(self):
+        sim = self.color_similarity
+        codes = sim.attribute_codes(self.ids + ["not an id"])
+        self.assertEqual(codes[1], codes[2])
+        self.assertNotEqual(codes[0], codes[1])
+        self.assertEqual(-1, codes[4])
+
+    def test_compare_batch(self):
+        predicted = np.array([self.ids, [self.id1, self.id0, None, None]], dtype=object)
+        target = [[self.id1], ["not an id", self.id2]]
+        for sim in [self.color_similarity, IdenticalSimilarity()]:
+            actual = sim.compare_batch(predicted, target)
+            expected = [
+                list(sim.compare_one(self.ids, target[0])),
+                list(sim.compare_one([self.id1, self.id0], target[1])) + [False] * 2,
+            ]
+            self.assertEqual(expected, actual.tolist())
+
+            # the per-customer loop of the base class gives the same result
+            actual = Similarity.compare_batch(sim, predicted, target)
+            self.assertEqual(expected, actual.tolist())
@@ -3,8 +3,9 @@ import unittest
 
 import numpy as np
 
-from hmcollab import splitter
+from hmcollab import datasets, splitter
 from hmcollab.three_part_dataset import prune_articles, prune_customers
+from hmcollab.time_index import TimeIndex, day_numbers
 from hmcollab.tests import fake_data
 
 
@@ -63,6 +64,55 @@ class TestSplitter(unittest.TestCase):
         newer = np.transactions
         self.twenty_day_older_newer_split_test(older, newer)
 
+    def test_rolling_windows_expanding(self):
+        transactions = self.fake_dataset.transactions
+        folds = list(splitter.rolling_windows(transactions, days=7, windows=3))
+        self.assertEqual(3, len(folds))
+
+        # the newest fold is the usual split
+        older, newer = splitter.split_by_time(transactions, 7)
+        history, target = folds[-1]
+        self.assertTrue(older.equals(history))
+        self.assertTrue(newer.equals(target))
+
+        for (history, target), (next_history, next_target) in zip(folds, folds[1:]):
+            self.assertEqual(history.shape[0] + target.shape[0], next_history.shape[0])
+            self.assertLess(target.t_dat.max(), next_target.t_dat.min())
+            self.assertLess(history.t_dat.max(), target.t_dat.min())
+            delta = next_target.t_dat.min() - target.t_dat.min()
+            self.assertLessEqual(delta, datetime.timedelta(days=7))
+
+    def test_rolling_windows_match_relevant_windows(self):
+        transactions = self.fake_dataset.transactions
+        folds = list(
+            splitter.rolling_windows(transactions, days=7, windows=4, relevant=True)
+        )
+        windows = [(7 * i, 7) for i in reversed(range(4))]
+        expected = datasets.relevant_windows(transactions, windows)
+        time_index = TimeIndex(transactions)
+        for window, (history, target, relevant_set) in zip(windows, folds):
+            self.assertTrue(
+                transactions.iloc[time_index.window(*window)].equals(target)
+            )
+            self.assertTrue(expected[window].equals(relevant_set))
+            self.assertTrue(datasets.target_to_relevant(target).equals(relevant_set))
+
+        # every target but the newest (which holds its cutoff day) spans 7 days
+        for _, target, _ in folds[:-1]:
+            self.assertLessEqual(
+                target.t_dat.max() - target.t_dat.min(), datetime.timedelta(days=6)
+            )
+
+    def test_rolling_windows_sliding(self):
+        transactions = self.fake_dataset.transactions
+        for history, target in splitter.rolling_windows(
+            transactions, days=7, windows=3, history_days=28
+        ):
+            self.assertGreater(history.shape[0], 0)
+            span = history.t_dat.max() - history.t_dat.min()
+            self.assertLess(span, datetime.timedelta(days=28))
+            self.assertLess(history.t_dat.max(), target.t_dat.min())
+
     def test_prune_customers(self):
         customer_df = self.fake_dataset.customers
         customer_ids = {
@@ -148,6 +198,27 @@ class TestSplitter(unittest.TestCase):
         actual = set(ds.transactions.article_id.unique())
         self.assertEqual(expected, actual)
 
+    def test_customer_portion_encoded(self):
+        all_customer_ids = self.fake_dataset.customers.customer_id.unique()
+        r = np.random.RandomState(42)
+        customer_ids = r.choice(all_customer_ids, size=4, replace=False)
+        cp = splitter.CustomerPortion(customer_ids)
+        expected = cp.split(self.fake_dataset)
+        actual = cp.split(self.fake_dataset.encode())
+
+        self.assertTrue(actual.encoded)
+        self.assertTrue(expected.transactions.equals(actual.decode().transactions))
+        self.assertTrue(expected.customers.equals(actual.decode().customers))
+        self.assertTrue(expected.articles.equals(actual.decode().articles))
+
+    def test_standard_strategy_encoded(self):
+        expected = splitter.StandardStrategy(self.fake_dataset, 20)
+        actual = splitter.StandardStrategy(self.fake_dataset.encode(), 20)
+        for e, a in zip(expected.partition, actual.partition):
+            self.assertTrue(a.encoded)
+            self.assertTrue(e.transactions.equals(a.decode().transactions))
+            self.assertTrue(e.articles.equals(a.decode().articles))
+
     def test_split_by_customer_train_test_strategy_default(self):
         strategy = splitter.SplitByCustomerTrainTestStrategy(self.fake_dataset, 0.2)
         full_ids = self.fake_dataset.customers.customer_id.unique()
@@ -239,6 +310,18 @@ class TestSplitter(unittest.TestCase):
         newer = np.transactions
         self.twenty_day_older_newer_split_test(older, newer)
 
+    def test_time_split_strategy_days(self):
+        time_spliter = splitter.TimeSplitStrategy(20)
+        self.assertEqual(20, time_spliter.days)
+        self.assertEqual(20, time_spliter.older_portion.days)
+        self.assertEqual(20, time_spliter.newer_portion.days)
+        for strategy in [
+            splitter.XYStrategy(self.fake_dataset, 20),
+            splitter.StandardStrategy(self.fake_dataset, 20),
+        ]:
+            self.assertIsInstance(strategy.older_portion, splitter.OlderPortion)
+            self.assertIsInstance(strategy.newer_portion, splitter.NewerPortion)
+
     def test_xy_strategy(self):
         xy_strategy = splitter.XYStrategy(self.fake_dataset, 20)
         self.twenty_day_older_newer_split_test(
@@ -276,6 +359,76 @@ class TestSplitter(unittest.TestCase):
         cutoff_date = mid_max - datetime.timedelta(days=20)
         self.assertLess(old_max, cutoff_date)
 
+    def assert_same_datasets(self, expected, actual):
+        self.assertTrue(expected.transactions.equals(actual.transactions))
+        self.assertTrue(expected.customers.equals(actual.customers))
+        self.assertTrue(expected.articles.equals(actual.articles))
+
+    def test_standard_strategy_matches_portions(self):
+        older = splitter.OlderPortion(20).split(self.fake_dataset)
+        expected = [
+            splitter.OlderPortion(20).split(older),
+            splitter.NewerPortion(20).split(older),
+            splitter.NewerPortion(20).split(self.fake_dataset),
+        ]
+        actual = splitter.StandardStrategy(self.fake_dataset, 20).partition
+        self.assertEqual(3, len(actual))
+        for e, a in zip(expected, actual):
+            self.assert_same_datasets(e, a)
+
+    def test_partition_keeps_time_index(self):
+        for portion in splitter.StandardStrategy(self.fake_dataset, 20).partition:
+            time_index = portion._time_index
+            self.assertIs(portion.transactions, time_index.df)
+            self.assertIs(time_index, portion.time_index)
+            expected = day_numbers(portion.transactions.t_dat)
+            self.assertEqual(list(expected), list(time_index.day))
+
+    def test_partitioner_customer_groups(self):
+        ids = self.fake_dataset.customers.customer_id.values
+        groups = [ids[:10], ids[10:40]]
+        partitioner = splitter.Partitioner(self.fake_dataset, customer_groups=groups)
+        self.assertEqual(2, partitioner.count)
+
+        # customers in no group are in no partition
+        outside = self.fake_dataset.transactions.customer_id.isin(ids[40:]).values
+        self.assertTrue(np.all(partitioner.labels[outside] == -1))
+
+        for ids, actual in zip(groups, partitioner.partition()):
+            expected = splitter.CustomerPortion(ids).split(self.fake_dataset)
+            self.assert_same_datasets(expected, actual)
+
+    def test_partitioner_overlapping_customer_groups(self):
+        ids = self.fake_dataset.customers.customer_id.values
+        with self.assertRaises(ValueError):
+            splitter.Partitioner(
+                self.fake_dataset, customer_groups=[ids[:10], ids[5:20]]
+            )
+        # an id repeated within one group is not an overlap
+        partitioner = splitter.Partitioner(
+            self.fake_dataset, customer_groups=[np.concatenate([ids[:10], ids[:2]])]
+        )
+        self.assertEqual(1, partitioner.count)
+
+    def test_partitioner_customer_groups_and_cutoffs(self):
+        ids = self.fake_dataset.customers.customer_id.values
+        groups = [ids[:50], ids[50:]]
+        cutoff = self.fake_dataset.time_index.cutoff(20)
+        partitioner = splitter.Partitioner(
+            self.fake_dataset, cutoffs=[cutoff], customer_groups=groups
+        )
+        partition = partitioner.partition()
+        self.assertEqual(4, len(partition))
+
+        for g, ids in enumerate(groups):
+            for t, portion in enumerate([splitter.OlderPortion, splitter.NewerPortion]):
+                older_or_newer = portion(20).split(self.fake_dataset)
+                expected = splitter.CustomerPortion(ids).split(older_or_newer)
+                expected.customers = prune_customers(
+                    expected.customers, transactions=expected.transactions
+                )
+                self.assert_same_datasets(expected, partition[2 * g + t])
+
     def test_customer_train_test_val_strategy(self):
         strategy = splitter.SplitByCustomerTrainTestValidationStrategy(
             self.fake_dataset, 0.2, 0.2
@@ -302,3 +455,53 @@ class TestSplitter(unittest.TestCase):
 
         actual = test_ids.intersection(val_ids)
         self.assertEqual(expected, actual)
+
+    def test_customer_hash(self):
+        ids = self.fake_dataset.customers.customer_id.values
+        customer_hash = splitter.CustomerHash([0.6, 0.2, 0.2], seed=42)
+        labels = customer_hash.labels(ids)
+        self.assertEqual(set(range(3)), set(labels))
+        self.assertEqual(list(labels), list(customer_hash.labels(ids)))
+
+        # labels of a subsample are the labels in the full set
+        self.assertEqual(list(labels[::3]), list(customer_hash.labels(ids[::3])))
+
+        # a different seed gives a different split
+        other = splitter.CustomerHash([0.6, 0.2, 0.2], seed=7).labels(ids)
+        self.assertNotEqual(list(labels), list(other))
+
+        # fractions are roughly respected
+        many = [fake_data.customer_id(i) for i in range(10000)]
+        counts = np.bincount(customer_hash.labels(many)) / 10000
+        self.assertTrue(np.allclose([0.6, 0.2, 0.2], counts, atol=0.02))
+
+    def test_customer_hash_fractions(self):
+        for fractions in [[], [0.5, 0.6], [0.8, 0.3, -0.1], [1.0, 0.0], [0.5, 0.4]]:
+            with self.assertRaises(ValueError):
+                splitter.CustomerHash(fractions)
+        self.assertEqual(3, len(splitter.CustomerHash([0.6, 0.2, 0.2])))
+
+    def test_customer_hash_encoded(self):
+        customer_hash = splitter.CustomerHash([0.5, 0.5])
+        encoded = self.fake_dataset.encode()
+        expected = customer_hash.labels(self.fake_dataset.transactions.customer_id)
+        actual = customer_hash.dataset_labels(encoded, encoded.transactions.customer_id)
+        self.assertEqual(list(expected), list(actual))
+
+    def test_split_by_customer_hash_strategy(self):
+        strategy = splitter.SplitByCustomerHashStrategy(self.fake_dataset, 0.2, 0.2)
+        full_ids = set(self.fake_dataset.customers.customer_id)
+        train_ids = set(strategy.train.customers.customer_id)
+        test_ids = set(strategy.test.customers.customer_id)
+        val_ids = set(strategy.validation.customers.customer_id)
+
+        self.assertEqual(full_ids, train_ids.union(test_ids).union(val_ids))
+        self.assertEqual(set(), train_ids.intersection(test_ids))
+        self.assertEqual(set(), train_ids.intersection(val_ids))
+        self.assertEqual(set(), test_ids.intersection(val_ids))
+
+        self.assertEqual(
+            self.fake_dataset.transactions.shape[0],
+            sum(p.transactions.shape[0] for p in strategy.partition),
+        )
+        self.assertEqual(test_ids, set(strategy.test.transactions.customer_id))
@@ -0,0 +1,107 @@
+import datetime
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from hmcollab import splitter
+from hmcollab.time_index import TimeIndex, day_numbers
+from hmcollab.tests import fake_data
+
+
+class TestTimeIndex(unittest.TestCase):
+    def setUp(self):
+        self.fake_dataset = fake_data.random_dataset(
+            n_customers=100, n_articles=1000, n_transactions=10000
+        )
+        self.transactions = self.fake_dataset.transactions
+        self.time_index = TimeIndex(self.transactions)
+
+    def tearDown(self):
+        pass
+
+    def masks(self, days):
+        t = self.transactions
+        cutoff_date = t.t_dat.max() - datetime.timedelta(days=days)
+        return t.t_dat < cutoff_date, t.t_dat >= cutoff_date
+
+    def test_day_numbers(self):
+        expected = [0, 1, 19000]
+        actual = day_numbers(pd.Series(["1970-01-01", "1970-01-02", "2022-01-08"]))
+        self.assertEqual(expected, list(actual))
+
+    def test_split(self):
+        older_mask, newer_mask = self.masks(20)
+        older, newer = self.time_index.split(20)
+        self.assertTrue(self.transactions[older_mask].equals(older.df))
+        self.assertTrue(self.transactions[newer_mask].equals(newer.df))
+        self.assertEqual(older.df.shape[0], len(older))
+
+    def test_split_of_split(self):
+        older, _ = self.time_index.split(20)
+        expected_older, expected_newer = splitter.split_by_time(older.df.copy(), 20)
+        actual_older, actual_newer = older.split(20)
+        self.assertTrue(expected_older.equals(actual_older.df))
+        self.assertTrue(expected_newer.equals(actual_newer.df))
+
+    def test_partition(self):
+        last = self.time_index.last_day
+        cutoffs = [last - 60, last - 20]
+        oldest, middle, newest = self.time_index.partition(cutoffs)
+        self.assertEqual(
+            len(self.transactions), len(oldest) + len(middle) + len(newest)
+        )
+        day = self.time_index.day
+        self.assertTrue(np.all(day[oldest] < cutoffs[0]))
+        self.assertTrue(np.all(day[middle] >= cutoffs[0]))
+        self.assertTrue(np.all(day[middle] < cutoffs[1]))
+        self.assertTrue(np.all(day[newest] >= cutoffs[1]))
+        self.assertTrue(np.all(np.diff(middle) > 0))
+
+        expected = middle
+        actual = self.time_index.positions(start=cutoffs[0], end=cutoffs[1])
+        self.assertEqual(list(expected), list(actual))
+
+    def test_string_dates_are_parsed_once(self):
+        df = self.transactions.copy()
+        df["t_dat"] = df.t_dat.dt.strftime("%Y-%m-%d")
+        time_index = TimeIndex(df)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df.t_dat))
+        self.assertEqual(list(self.time_index.day), list(time_index.day))
+
+        column = df["t_dat"]
+        splitter.split_by_time(df, 20, time_index=time_index)
+        self.assertIs(column, df["t_dat"])
+
+    def test_dataset_time_index(self):
+        time_index = self.fake_dataset.time_index
+        self.assertIs(time_index, self.fake_dataset.time_index)
+        older = splitter.OlderPortion(20).split(self.fake_dataset)
+        self.assertIs(older.transactions, older.time_index.df)
+
+    def test_window(self):
+        older, newer = self.time_index.split(20)
+        expected = newer.df
+        actual = self.transactions.iloc[self.time_index.window(0, 20)]
+        self.assertTrue(expected.equals(actual))
+
+        day = self.time_index.day
+        last_day = self.time_index.last_day
+        actual = day[self.time_index.window(20, 20)]
+        self.assertTrue(np.all((last_day - 40 <= actual) & (actual < last_day - 20)))
+        expected = np.flatnonzero((last_day - 40 <= day) & (day < last_day - 20))
+        self.assertEqual(list(expected), list(self.time_index.window(20, 20)))
+
+        self.assertEqual(0, len(self.time_index.window(10000, 7)))
+
+    def test_adjacent_windows(self):
+        # consecutive windows tile the days before the newest one without overlap
+        windows = [self.time_index.window(offset, 7) for offset in range(0, 70, 7)]
+        positions = np.concatenate(windows)
+        self.assertEqual(len(positions), len(np.unique(positions)))
+        for newer, older in zip(windows[:-1], windows[1:]):
+            if len(newer) and len(older):
+                day = self.time_index.day
+                self.assertLess(day[older].max(), day[newer].min())
+        expected = np.flatnonzero(self.time_index.day >= self.time_index.cutoff(70))
+        self.assertEqual(list(expected), sorted(positions))
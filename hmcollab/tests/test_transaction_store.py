@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from hmcollab import datasets, splitter, transactions
+from hmcollab.directory_tree import HMDatasetDirectoryTree
+from hmcollab.transaction_store import TransactionStore
+from hmcollab.tests import fake_data
+
+
+class TestTransactionStore(unittest.TestCase):
+    def setUp(self):
+        self.dataset = fake_data.random_dataset(
+            n_customers=100, n_articles=1000, n_transactions=10000
+        )
+        self.store = TransactionStore.from_frame(self.dataset.transactions)
+
+    def tearDown(self):
+        pass
+
+    def test_layout(self):
+        store = self.store
+        self.assertEqual(self.dataset.transactions.shape, store.shape)
+        self.assertEqual(101, len(store.offsets))
+        self.assertEqual(len(store), store.offsets[-1])
+        self.assertTrue(np.all(np.diff(store.customer) >= 0))
+        for c in [0, 50, 99]:
+            rows = slice(store.offsets[c], store.offsets[c + 1])
+            self.assertTrue(np.all(store.customer[rows] == c))
+            self.assertTrue(np.all(np.diff(store.day[rows]) >= 0))
+
+    def test_to_frame(self):
+        expected = self.dataset.transactions.sort_values(
+            ["customer_id", "t_dat"], kind="stable"
+        ).reset_index(drop=True)
+        actual = self.store.to_frame()
+        self.assertEqual(list(expected.columns), list(actual.columns))
+        self.assertEqual(list(expected.t_dat), list(actual.t_dat))
+        self.assertEqual(list(expected.customer_id), list(actual.customer_id))
+        self.assertEqual(list(expected.article_id), list(actual.article_id))
+        self.assertTrue(np.allclose(expected.price, actual.price))
+
+    def test_all_article_ids(self):
+        customer = "05a"
+        expected = transactions.TransactionsByCustomer(
+            self.dataset.transactions
+        ).all_article_ids(customer)
+        actual = transactions.TransactionsByCustomer(self.store).all_article_ids(
+            customer
+        )
+        self.assertEqual(sorted(expected), sorted(actual))
+        self.assertEqual("article_id", actual.name)
+
+        actual = self.store.all_article_ids("not an id")
+        self.assertEqual(0, len(actual))
+
+    def test_split_by_time(self):
+        expected_x, expected_y = splitter.split_by_time(
+            self.dataset.transactions, days=20
+        )
+        actual_x, actual_y = splitter.split_by_time(self.store, days=20)
+        self.assertEqual(expected_x.shape, actual_x.shape)
+        self.assertEqual(expected_y.shape, actual_y.shape)
+        self.assertEqual(expected_y.t_dat.min(), actual_y.to_frame().t_dat.min())
+        self.assertEqual(len(actual_y), actual_y.offsets[-1])
+
+    def test_target_to_relevant(self):
+        _, expected_y = splitter.split_by_time(self.dataset.transactions, days=20)
+        expected = datasets.target_to_relevant(expected_y)
+        _, actual_y = splitter.split_by_time(self.store, days=20)
+        actual = datasets.target_to_relevant(actual_y)
+
+        self.assertEqual(list(expected.customer_id), list(actual.customer_id))
+        for e, a in zip(expected.target, actual.target):
+            self.assertEqual(sorted(e.split(" ")), sorted(a.split(" ")))
+
+        codes = datasets.target_to_relevant(actual_y, as_codes=True)
+        self.assertTrue(actual.equals(codes.to_frame()))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tree = HMDatasetDirectoryTree(base=directory, cache=False)
+            self.store.save(tree.transaction_store)
+            store = tree.load_transaction_store()
+            self.assertIsInstance(store.customer, np.memmap)
+            # ids are memory-mapped utf-8 bytes, decoded only when looked up
+            for name in ["customer_ids", "article_ids"]:
+                words = getattr(store, name).words
+                self.assertIsInstance(words, np.memmap)
+                self.assertEqual("S", words.dtype.kind)
+            customer = self.dataset.transactions.customer_id.iloc[0]
+            self.assertEqual(
+                list(self.store.all_article_ids(customer)),
+                list(store.all_article_ids(customer)),
+            )
+            self.assertIsNone(store.customer_ids._ids)
+            for name in TransactionStore.ARRAYS + ["offsets"]:
+                expected = getattr(self.store, name)
+                actual = getattr(store, name)
+                self.assertTrue(np.array_equal(expected, actual))
+            self.assertEqual(
+                list(self.store.customer_ids.ids), list(store.customer_ids.ids)
+            )
+            pd.testing.assert_frame_equal(self.store.to_frame(), store.to_frame())
+            del store
+
+    def test_rebuild_stale_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tree = HMDatasetDirectoryTree(base=directory, cache=False)
+            transactions = self.dataset.transactions
+            transactions.to_csv(tree.transactions, index=False)
+            # a store without a stamp, e.g. left by an interrupted build
+            TransactionStore.from_frame(transactions.iloc[:10]).save(
+                tree.transaction_store
+            )
+            self.assertFalse(tree.transaction_store_is_current)
+            store = tree.load_transaction_store()
+            self.assertEqual(len(transactions), len(store))
+            self.assertTrue(tree.transaction_store_is_current)
+            self.assertFalse(os.path.exists(tree.transaction_store + ".partial"))
+            del store
+
+            transactions.iloc[:100].to_csv(tree.transactions, index=False)
+            self.assertFalse(tree.transaction_store_is_current)
+            store = tree.load_transaction_store()
+            self.assertEqual(100, len(store))
+            del store
@@ -1,5 +1,6 @@
 import unittest
 
+import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
 
@@ -127,3 +128,24 @@ class TestTransactions(unittest.TestCase):
         ).cluster_centers_
 
         self.assertEqual(expected.tolist(), actual.tolist())
+
+    def test_kmeans_consumer_sparse(self):
+        features = ["color", "article"]
+        dense = articles.ArticleFeatureMungerSpecificFeatures(
+            self.dataset.articles, features=features, use_article_id=True
+        ).x
+        sparse = articles.ArticleFeatureMungerSpecificFeatures(
+            self.dataset.articles, features=features, sparse=True
+        ).x
+        t = transactions.TransactionsByCustomer(self.dataset.transactions)
+
+        expected = t.customer_dummies(self.customer, dense)
+        actual = t.customer_dummies(self.customer, sparse)
+        self.assertEqual(expected.values.tolist(), actual.values.toarray().tolist())
+        expected = expected.drop_duplicates()
+        actual = actual.drop_duplicates()
+        self.assertEqual(expected.values.tolist(), actual.values.toarray().tolist())
+
+        expected = transactions.kmeans_consumer(expected, k=self.clusters)
+        actual = transactions.kmeans_consumer(actual, k=self.clusters)
+        self.assertTrue(np.allclose(expected.cluster_centers_, actual.cluster_centers_))
@@ -1,15 +1,83 @@
+from hmcollab.encoding import DatasetIds, is_encoded
+from hmcollab.time_index import TimeIndex
+
+
 class ThreePartDataset:
-    def __init__(self, articles, customers, transactions, prune=False):
+    def __init__(self, articles, customers, transactions, prune=False, ids=None):
+        """
+        :param ids: DatasetIds if the customer_id and article_id columns of all three
+            tables hold int32 codes rather than string ids. See encode().
+        """
         self.articles = articles
         self.customers = customers
         self.transactions = transactions
+        self.ids = ids
+        self._time_index = None
         if prune:
             self.prune()
 
+    @property
+    def encoded(self):
+        return self.ids is not None
+
+    @property
+    def time_index(self):
+        """TimeIndex of the transactions, built on first use and reused by every
+        time split of this dataset"""
+        if self._time_index is None or self._time_index.df is not self.transactions:
+            self._time_index = TimeIndex(self.transactions)
+        return self._time_index
+
+    @time_index.setter
+    def time_index(self, time_index):
+        self._time_index = time_index
+
     def prune(self):
         self.articles = prune_articles(self.articles, transactions=self.transactions)
         self.customers = prune_customers(self.customers, transactions=self.transactions)
 
+    def encode(self):
+        """Return a copy of this dataset with customer and article ids replaced by
+        int32 codes into shared dictionaries. Joins and membership tests on the
+        copy compare integers instead of strings."""
+        if self.encoded:
+            return self
+        ids = DatasetIds.from_tables(self.articles, self.customers, self.transactions)
+        return ThreePartDataset(
+            ids.encode_frame(self.articles),
+            ids.encode_frame(self.customers),
+            ids.encode_frame(self.transactions),
+            ids=ids,
+        )
+
+    def decode(self):
+        """Return a copy of this dataset with string ids, e.g. for export"""
+        if not self.encoded:
+            return self
+        return ThreePartDataset(
+            self.ids.decode_frame(self.articles),
+            self.ids.decode_frame(self.customers),
+            self.ids.decode_frame(self.transactions),
+        )
+
+    def customer_keys(self, customer_ids):
+        """Convert customer ids to the representation used in this dataset's tables"""
+        if self.encoded and not is_encoded(customer_ids):
+            return self.ids.customers.encode(customer_ids)
+        return customer_ids
+
+    def customer_labels(self, customer_keys):
+        """Convert customer keys from this dataset's tables to string ids"""
+        if self.encoded:
+            return self.ids.customers.decode(customer_keys)
+        return customer_keys
+
+    def article_labels(self, article_keys):
+        """Convert article keys from this dataset's tables to string ids"""
+        if self.encoded:
+            return self.ids.articles.decode(article_keys)
+        return article_keys
+
 
 def prune_customers(customers, customer_ids=None, transactions=None):
     if transactions is not None:
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+
+def day_numbers(t_dat) -> np.array:
+    """Days since 1970-01-01 for a column of dates or ISO date strings"""
+    t_dat = pd.to_datetime(t_dat, format="%Y-%m-%d")
+    return t_dat.values.astype("datetime64[D]").astype(np.int32)
+
+
+class TimeIndex:
+    """Integer day numbers of a transactions frame and the positions of its rows
+    sorted by day. Any cutoff split is a binary search over the sorted days, and
+    its parts keep the rows in their original order."""
+
+    def __init__(self, df, day=None):
+        """
+        :param df: Transactions with column t_dat. If t_dat holds strings, it is
+            converted to datetimes in place, once.
+        :param day: Day numbers of the rows of df, if already known
+        """
+        if not pd.api.types.is_datetime64_any_dtype(df["t_dat"]):
+            df["t_dat"] = pd.to_datetime(df["t_dat"].copy(), format="%Y-%m-%d")
+        if day is None:
+            day = day_numbers(df["t_dat"])
+        self.df = df
+        self.day = day
+        self.order = np.argsort(day, kind="stable")
+        self.sorted_day = day[self.order]
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def last_day(self):
+        return self.sorted_day[-1]
+
+    def last_day_before(self, day):
+        """Last day number strictly before day"""
+        return self.sorted_day[np.searchsorted(self.sorted_day, day) - 1]
+
+    def cutoff(self, days):
+        """Day number that is days before the last transaction"""
+        return self.last_day - days
+
+    def positions(self, start=None, end=None) -> np.array:
+        """Positions of the rows with start <= day < end, in original row order"""
+        lo = 0 if start is None else np.searchsorted(self.sorted_day, start)
+        hi = len(self) if end is None else np.searchsorted(self.sorted_day, end)
+        return np.sort(self.order[lo:hi])
+
+    def window(self, offset, horizon) -> np.array:
+        """Positions of the rows with cutoff(offset + horizon) <= day < cutoff(offset),
+        in original row order. The newest window (offset 0) has no upper bound, so
+        window(0, days) is the newer part of split(days), including its cutoff day.
+        Windows (offset, horizon) and (offset + horizon, horizon) are adjacent and
+        never share a day.
+
+        Unlike splitting the older part again (as splitter.StandardStrategy does),
+        the bounds do not depend on which days have transactions.
+        """
+        if not len(self):
+            return self.order[:0]
+        end = self.cutoff(offset) if offset else None
+        return self.positions(start=self.cutoff(offset + horizon), end=end)
+
+    def partition(self, cutoffs) -> list:
+        """Positions of the rows in each of the len(cutoffs) + 1 intervals between
+        ascending day number cutoffs, oldest first"""
+        bounds = np.searchsorted(self.sorted_day, cutoffs)
+        bounds = np.concatenate([[0], bounds, [len(self)]])
+        return [np.sort(self.order[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def subset(self, positions):
+        """TimeIndex of the rows at positions, without parsing dates again"""
+        return TimeIndex(self.df.iloc[positions], day=self.day[positions])
+
+    def split_at(self, cutoffs) -> list:
+        """TimeIndex for each interval between ascending day number cutoffs"""
+        return [self.subset(positions) for positions in self.partition(cutoffs)]
+
+    def split(self, days):
+        """Same split as splitter.split_by_time: older and newer TimeIndex"""
+        if not len(self):
+            return self, self
+        older, newer = self.split_at([self.cutoff(days)])
+        return older, newer
@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from hmcollab.encoding import DatasetIds, IdDictionary, RelevantCodes
+from hmcollab.time_index import day_numbers
+
+
+class TransactionStore:
+    """Transactions as parallel numpy arrays (customer code, article code, day number,
+    price, channel) sorted by customer and then by day. The rows of customer code c
+    are offsets[c]:offsets[c + 1].
+
+    A store is built once with from_frame and saved with save. Opening it again with
+    mmap_mode="r" lets several processes share one copy through the page cache,
+    including the id dictionaries, which are stored as utf-8 bytes and decoded only
+    for the ids that are looked up.
+    """
+
+    ARRAYS = ["customer", "article", "day", "price", "channel"]
+
+    def __init__(
+        self,
+        customer,
+        article,
+        day,
+        price,
+        channel,
+        customer_ids: IdDictionary,
+        article_ids: IdDictionary,
+        offsets=None,
+    ):
+        self.customer = customer
+        self.article = article
+        self.day = day
+        self.price = price
+        self.channel = channel
+        self.customer_ids = customer_ids
+        self.article_ids = article_ids
+        if offsets is None:
+            offsets = np.searchsorted(
+                customer, np.arange(len(customer_ids) + 1, dtype=customer.dtype)
+            )
+        self.offsets = offsets
+
+    @classmethod
+    def from_frame(cls, df):
+        customer_ids = IdDictionary(df.customer_id.values)
+        article_ids = IdDictionary(df.article_id.values)
+        customer = customer_ids.encode(df.customer_id.values)
+        day = day_numbers(df.t_dat)
+        order = np.lexsort((day, customer))
+        return cls(
+            customer[order],
+            article_ids.encode(df.article_id.values)[order],
+            day[order],
+            df.price.values.astype(np.float32)[order],
+            df.sales_channel_id.values.astype(np.int8)[order],
+            customer_ids,
+            article_ids,
+        )
+
+    def save(self, directory):
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+        for name in self.ARRAYS + ["offsets"]:
+            np.save(os.path.join(directory, name + ".npy"), getattr(self, name))
+        # fixed width utf-8 arrays can be saved without pickling, and memory-mapped
+        for name in ["customer_ids", "article_ids"]:
+            np.save(
+                os.path.join(directory, name + ".npy"), getattr(self, name).to_bytes()
+            )
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        def array(name, mmap_mode=mmap_mode):
+            return np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode)
+
+        def ids(name):
+            words = array(name)
+            if words.dtype.kind == "U":
+                # stores saved with unicode ids
+                return IdDictionary(words.astype(object))
+            return IdDictionary.from_bytes(words)
+
+        columns = [array(name) for name in cls.ARRAYS]
+        customer_ids = ids("customer_ids")
+        article_ids = ids("article_ids")
+        return cls(*columns, customer_ids, article_ids, offsets=array("offsets"))
+
+    def __len__(self):
+        return len(self.customer)
+
+    @property
+    def shape(self):
+        return len(self), len(self.ARRAYS)
+
+    def subset(self, mask):
+        """Store with the rows selected by a boolean mask. Rows stay sorted by customer."""
+        columns = [getattr(self, name)[mask] for name in self.ARRAYS]
+        return TransactionStore(*columns, self.customer_ids, self.article_ids)
+
+    def customer_rows(self, customer):
+        code = self.customer_ids.encode([customer])[0]
+        if code < 0:
+            return slice(0, 0)
+        return slice(self.offsets[code], self.offsets[code + 1])
+
+    def all_article_ids(self, customer):
+        articles = self.article[self.customer_rows(customer)]
+        return pd.Series(self.article_ids.decode(articles), name="article_id")
+
+    def split_by_time(self, days):
+        """Same cutoff as splitter.split_by_time, returning two stores"""
+        cutoff = self.day.max() - days
+        older = self.day < cutoff
+        return self.subset(older), self.subset(~older)
+
+    def to_relevant(self, as_codes=False):
+        """Same frame as datasets.target_to_relevant, with each customer's articles in
+        day order. With as_codes, the rows are returned as RelevantCodes."""
+        counts = np.diff(self.offsets)
+        customers = np.flatnonzero(counts)
+        if as_codes:
+            offsets = np.concatenate([[0], np.cumsum(counts[customers])])
+            ids = DatasetIds(self.customer_ids, self.article_ids)
+            return RelevantCodes(customers, offsets, np.asarray(self.article), ids)
+        articles = self.article_ids.decode(self.article)
+        targets = [
+            " ".join(articles[self.offsets[c] : self.offsets[c + 1]]) for c in customers
+        ]
+        return pd.DataFrame(
+            {"customer_id": self.customer_ids.decode(customers), "target": targets}
+        )
+
+    def to_frame(self):
+        return pd.DataFrame(
+            {
+                "t_dat": pd.to_datetime(np.asarray(self.day).astype("datetime64[D]")),
+                "customer_id": self.customer_ids.decode(self.customer),
+                "article_id": self.article_ids.decode(self.article),
+                "price": self.price,
+                "sales_channel_id": self.channel,
+            }
+        )
@@ -1,19 +1,28 @@
-import pandas as pd
 from sklearn.cluster import KMeans
 
+from hmcollab.articles import SparseDummies
+from hmcollab.transaction_store import TransactionStore
+
 
 class TransactionsByCustomer:
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df):
+        """
+        :param df: DataFrame of transactions or a TransactionStore
+        """
         self.df = df
 
     def all_article_ids(self, customer):
+        if isinstance(self.df, TransactionStore):
+            return self.df.all_article_ids(customer)
         return self.df.loc[self.df.customer_id == customer, "article_id"]
 
     def customer_dummies(self, customer, full_articles_dummy):
         basket = self.all_article_ids(customer)
-        return full_articles_dummy.merge(basket, on="article_id", how="inner").drop(
-            columns="article_id"
-        )
+        dummies = full_articles_dummy.merge(basket, on="article_id", how="inner")
+        if isinstance(dummies, SparseDummies):
+            # article_id is not one of the columns of the sparse matrix
+            return dummies
+        return dummies.drop(columns="article_id")
 
 
 def kmeans_consumer(customer_dummies, k=1):
@@ -21,4 +30,6 @@ def kmeans_consumer(customer_dummies, k=1):
     kmeans = KMeans(
         init="k-means++", n_clusters=k, n_init=10, max_iter=300, random_state=42
     )
+    if isinstance(customer_dummies, SparseDummies):
+        customer_dummies = customer_dummies.values
     return kmeans.fit(customer_dummies)
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class RowView:
+    """Rows of a base DataFrame selected by an array of positions. Only the positions
+    are held; frame() materializes the rows as a DataFrame when one is needed."""
+
+    def __init__(self, base, positions):
+        self.base = base
+        dtype = np.int32 if len(base) <= np.iinfo(np.int32).max else np.int64
+        self.positions = np.asarray(positions).astype(dtype, copy=False)
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def nbytes(self):
+        return self.positions.nbytes
+
+    def frame(self):
+        return self.base.iloc[self.positions]
+
+    def column(self, name):
+        return self.base[name].values[self.positions]
+
+    def where(self, base_mask):
+        """View of the rows of this view for which a mask over the base rows is True"""
+        return RowView(self.base, self.positions[base_mask[self.positions]])
+
+
+class LazyViews(dict):
+    """dict of RowViews, each built by calling builders[name]() on first access"""
+
+    def __init__(self, builders):
+        super().__init__()
+        self.builders = builders
+
+    def __missing__(self, name):
+        view = self.builders[name]()
+        self[name] = view
+        return view
+
+
+class ViewAttribute:
+    """Class attribute that materializes the RowView obj.views[name] on first access.
+    The frame is stored in obj.__dict__, like functools.cached_property, so later
+    accesses return it without copying the rows again."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        try:
+            view = obj.views[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+        df = view.frame()
+        obj.__dict__[self.name] = df
+        return df
@@ -4,6 +4,7 @@ import os
 from hmcollab import directories
 from hmcollab import datasets
 from hmcollab import splitter
+from hmcollab.time_index import TimeIndex
 
 
 def customer_split(dataset, customer_count):
@@ -18,6 +19,7 @@ def customer_split(dataset, customer_count):
 
 
 def save_main_data(pruned_dataset, base_path):
+    pruned_dataset = pruned_dataset.decode()
     customers_fn = directories.qualifyname(base_path, "customers.csv")
     article_fn = directories.qualifyname(base_path, "articles.csv")
     transaction_fn = directories.qualifyname(base_path, "transactions_train.csv")
@@ -34,6 +36,32 @@ def save_relevant_data(relevant_data, base_path, val=False):
     relevant_data.to_csv(relevant_fn, index=False)
 
 
+def save_relevant_windows(relevant_sets, base_path):
+    """Write each relevant set of relevant_windows to relevant_<offset>_<horizon>.csv"""
+    for (offset, horizon), relevant in relevant_sets.items():
+        name = "relevant_{}_{}.csv".format(offset, horizon)
+        relevant.to_csv(directories.qualifyname(base_path, name), index=False)
+
+
+def generate_relevant_windows(transactions_df, windows, directory_toy=None):
+    """Relevant sets for several (offset, horizon) windows in days, computed from a
+    single sort of the transactions by day (see TimeIndex.window). (0, days) is the
+    test window of generate_relevant and (days, days) the window before it.
+
+    Args:
+        transactions_df (_type_): transactions dataframe
+        windows (list): (offset, horizon) pairs, e.g. [(0, 7), (0, 14), (7, 7)]
+        directory_toy (str, optional): Directory name. Defaults to None.
+
+    Returns:
+        dict: relevant dataframe of each window, keyed by (offset, horizon)
+    """
+    relevant_sets = datasets.relevant_windows(transactions_df, windows)
+    if directory_toy is not None:
+        save_relevant_windows(relevant_sets, directories.data(directory_toy))
+    return relevant_sets
+
+
 def generate_relevant(transactions_df, directory_toy=None, days=7, val=False):
     """Relevant transactions are those of interest for prediction (i.e. the most
     recent transactions). It produces a dataframe with all relevant transactions by customer
@@ -50,12 +78,17 @@ def generate_relevant(transactions_df, directory_toy=None, days=7, val=False):
     Returns:
         _type_: dataframe by customer. Columns: "customer_id" and "target"
     """
-    transactions_x, transactions_y = splitter.split_by_time(transactions_df, days=days)
     if val:
-        _, transactions_y = splitter.split_by_time(transactions_x, days=days)
-    relevant = datasets.target_to_relevant(transactions_y)
+        # The validation target is the newer part of the older part split again, so
+        # it ends at the last transaction before the test window. Unlike the window
+        # (days, days), it depends on which days have transactions.
+        older, _ = TimeIndex(transactions_df).split(days)
+        _, newer = older.split(days)
+        relevant = datasets.target_to_relevant(newer.df)
+    else:
+        relevant = datasets.relevant_windows(transactions_df, [(0, days)])[(0, days)]
     if directory_toy is not None:
-        save_relevant_data(relevant, directories.data(directory_toy), val=False)
+        save_relevant_data(relevant, directories.data(directory_toy), val=val)
     return relevant
 
 
@@ -83,8 +116,8 @@ def generate_test_data(dataset):
 
 def generate_toy_and_relevant(dataset, directory_toy, size):
     toy = generate_toy(dataset, dir_name=directory_toy, size=size)
-    generate_relevant(toy.transactions, directory_toy, val=False)
-    generate_relevant(toy.transactions, directory_toy, val=True)
+    generate_relevant(toy.transactions, directory_toy=directory_toy, val=False)
+    generate_relevant(toy.transactions, directory_toy=directory_toy, val=True)
 
 
 def main():
@@ -1,3 +1,4 @@
+from hmcollab import bootstrap
 from hmcollab import datasets
 from hmcollab import articles
 from hmcollab import models
@@ -5,6 +6,7 @@ from hmcollab import scoring
 from hmcollab import similarity
 from hmcollab import directories
 from hmcollab import directory_tree
+from hmcollab import feature_cache
 
 
 import yaml
@@ -12,8 +14,24 @@ import sys
 from datetime import datetime
 
 
+def score_with_ci(recommendations, relevant_set, similarity):
+    """MAP@k and the bounds of its bootstrap confidence interval over customers"""
+    t = scoring.relevant(recommendations, relevant_set, similarity=similarity)
+    ap = scoring.ap_at_k_batch(*scoring.hit_matrix(t))
+    score, low, high = bootstrap.bootstrap_ci(ap)
+    return score, [float(low), float(high)]
+
+
 class StandardSetup:
-    def __init__(self, dataset, features, similarity, threshold=50):
+    def __init__(
+        self,
+        dataset,
+        features,
+        similarity,
+        threshold=50,
+        metric="euclidean",
+        dedupe=False,
+    ):
         self.data = dataset
         self.dummies = features.x
         # Only keep customers at train_x and train_y
@@ -25,6 +43,8 @@ class StandardSetup:
             set(self.data.train_vy.customer_id)
         )  # toy=607
         self.threshold = threshold
+        self.metric = metric
+        self.dedupe = dedupe
         # TODO: Is this right?
         self.rel_vy = datasets.target_to_relevant(self.data.train_vy)
         self.similarity = similarity
@@ -32,34 +52,51 @@ class StandardSetup:
     def try_multiple_k(self, k_list):
         scores_validation = []
         scores_test = []
+        ci_validation = []
+        ci_test = []
         for k in k_list:
             model = models.KnnRecommender(
-                self.data, self.dummies, groups=k, threshold=self.threshold
+                self.data,
+                self.dummies,
+                groups=k,
+                threshold=self.threshold,
+                metric=self.metric,
+                dedupe=self.dedupe,
             )
             recommendations = model.recommend_all(list(self.customers_at_vy))
             # TODO: Is this right?
-            t = scoring.relevant(
+            score_vy, ci_vy = score_with_ci(
                 recommendations, self.rel_vy, similarity=self.similarity
             )
-            score_vy = scoring.map_at_k(t)
             scores_validation.append(score_vy)
+            ci_validation.append(ci_vy)
             recommendations = model.recommend_all(list(self.customers_at_y))
-            t = scoring.relevant(
+            score_y, ci_y = score_with_ci(
                 recommendations, self.data.relevant_set, similarity=self.similarity
             )
-            score_y = scoring.map_at_k(t)
             scores_test.append(score_y)
+            ci_test.append(ci_y)
         scores_validation_float = [float(x) for x in scores_validation]
         scores_test_float = [float(x) for x in scores_test]
         return {
             "k": k_list,
             "map_at_k_validation": scores_validation_float,
             "map_at_k_test": scores_test_float,
+            "map_at_k_validation_ci": ci_validation,
+            "map_at_k_test_ci": ci_test,
         }
 
 
 class ThreeSetsSetup:
-    def __init__(self, dataset, features, similarity, threshold=10):
+    def __init__(
+        self,
+        dataset,
+        features,
+        similarity,
+        threshold=10,
+        metric="euclidean",
+        dedupe=False,
+    ):
         # TODO: We never use use_toy
         self.data = dataset
         self.dummies = features.x
@@ -79,6 +116,8 @@ class ThreeSetsSetup:
             set(self.data.test_y.customer_id)
         )
         self.threshold = threshold
+        self.metric = metric
+        self.dedupe = dedupe
         # self.threshold = 300
         # if use_toy:
         #     self.threshold = 10
@@ -97,32 +136,54 @@ class ThreeSetsSetup:
         def experiment(k, threshold):
             print("PROCESSING TRAINING SET...")
             model = models.KnnRecommender_for3(
-                self.data, self.dummies, groups=k, threshold=threshold, split="train"
+                self.data,
+                self.dummies,
+                groups=k,
+                threshold=threshold,
+                split="train",
+                metric=self.metric,
+                dedupe=self.dedupe,
             )
             recommendations = model.recommend_all(list(self.customers_at_y))
-            t = scoring.relevant(
+            score_y, ci_y = score_with_ci(
                 recommendations, self.rel_y, similarity=self.similarity
             )
-            score_y = scoring.map_at_k(t)
             print("PROCESSING VALIDATION SET...")
             model = models.KnnRecommender_for3(
-                self.data, self.dummies, groups=k, threshold=threshold, split="val"
+                self.data,
+                self.dummies,
+                groups=k,
+                threshold=threshold,
+                split="val",
+                metric=self.metric,
+                dedupe=self.dedupe,
             )
             recommendations = model.recommend_all(list(self.customers_at_vy))
-            t = scoring.relevant(
+            score_vy, ci_vy = score_with_ci(
                 recommendations, self.rel_vy, similarity=self.similarity
             )
-            score_vy = scoring.map_at_k(t)
             print("PROCESSING TEST SET...")
             model = models.KnnRecommender_for3(
-                self.data, self.dummies, groups=k, threshold=threshold, split="test"
+                self.data,
+                self.dummies,
+                groups=k,
+                threshold=threshold,
+                split="test",
+                metric=self.metric,
+                dedupe=self.dedupe,
             )
             recommendations = model.recommend_all(list(self.customers_at_ty))
-            t = scoring.relevant(
+            score_ty, ci_ty = score_with_ci(
                 recommendations, self.rel_ty, similarity=self.similarity
             )
-            score_ty = scoring.map_at_k(t)
-            return score_y, score_vy, score_ty
+            return {
+                "train": score_y,
+                "validation": score_vy,
+                "test": score_ty,
+                "train_ci": ci_y,
+                "validation_ci": ci_vy,
+                "test_ci": ci_ty,
+            }
 
         scores_train = []
         scores_validation = []
@@ -132,11 +193,17 @@ class ThreeSetsSetup:
                 self.threshold
             )
         )
+        ci_train = []
+        ci_validation = []
+        ci_test = []
         for k in k_list:
-            score_y, score_vy, score_ty = experiment(k=k, threshold=self.threshold)
-            scores_train.append(score_y)
-            scores_validation.append(score_vy)
-            scores_test.append(score_ty)
+            scores = experiment(k=k, threshold=self.threshold)
+            scores_train.append(scores["train"])
+            scores_validation.append(scores["validation"])
+            scores_test.append(scores["test"])
+            ci_train.append(scores["train_ci"])
+            ci_validation.append(scores["validation_ci"])
+            ci_test.append(scores["test_ci"])
         scores_train_float = [float(x) for x in scores_train]
         scores_validation_float = [float(x) for x in scores_validation]
         scores_test_float = [float(x) for x in scores_test]
@@ -145,6 +212,9 @@ class ThreeSetsSetup:
             "map_at_k_train": scores_train_float,
             "map_at_k_validation": scores_validation_float,
             "map_at_k_test": scores_test_float,
+            "map_at_k_train_ci": ci_train,
+            "map_at_k_validation_ci": ci_validation,
+            "map_at_k_test_ci": ci_test,
         }
 
 
@@ -162,10 +232,10 @@ def toy_location(toy_name="toy_orig"):
 
 def dataset_by_split_strategy(strategy, location):
     dataset = {
-        "threesets": datasets.HMDatasetThreeSets(tree=location),
-        "Standard": datasets.HMDatasetStandard(tree=location),
+        "threesets": datasets.HMDatasetThreeSets,
+        "Standard": datasets.HMDatasetStandard,
     }
-    return dataset[strategy]
+    return dataset[strategy](tree=location)
 
 
 def setup_by_split_strategy(strategy, location):
@@ -208,16 +278,22 @@ if __name__ == "__main__":
     tree = toy_location(config["toy"])
     i = 0
 
+    # the experiments share the dataset, and the feature matrix of each distinct
+    # feature list is encoded once and reused by later runs
+    dataset = dataset_by_split_strategy(config["split_strategy"], tree)
+    print("Toy customers length:", dataset.customers.shape)
+    sim = similarity.get_similarity(config.get("similarity", None), dataset.articles)
+    cache = feature_cache.FeatureCache(directories.models("feature_cache"))
+
     for exp in config["experiments"]:
         begin = datetime.now()
         i += 1
-        dataset = dataset_by_split_strategy(config["split_strategy"], tree)
-        print("Toy customers length:", dataset.customers.shape)
-        sim = similarity.get_similarity(
-            config.get("similarity", None), dataset.articles
-        )
         the_features = articles.ArticleFeatureMungerSpecificFeatures(
-            dataset.articles, features=exp["features"], use_article_id=True
+            dataset.articles,
+            features=exp["features"],
+            use_article_id=True,
+            sparse=config.get("sparse", False),
+            cache=cache,
         )
         if config["split_strategy"] == "threesets":
             toy_k = ThreeSetsSetup(
@@ -225,6 +301,8 @@ if __name__ == "__main__":
                 similarity=sim,
                 features=the_features,
                 threshold=config["threshold"],
+                metric=config.get("metric", "euclidean"),
+                dedupe=config.get("dedupe", False),
             )
         else:
             toy_k = StandardSetup(
@@ -232,6 +310,8 @@ if __name__ == "__main__":
                 similarity=sim,
                 features=the_features,
                 threshold=config["threshold"],
+                metric=config.get("metric", "euclidean"),
+                dedupe=config.get("dedupe", False),
             )
 
         results = toy_k.try_multiple_k(config["k"])